@@ -0,0 +1,4 @@
+"""Load benchmarks, run against a local site with e.g.
+
+    bench --site mysite.local execute tours_and_safaris.benchmarks.room_booking.run
+"""
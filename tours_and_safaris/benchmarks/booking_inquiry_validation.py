@@ -0,0 +1,74 @@
+# Copyright (c) 2025, wanguimbutu and contributors
+# For license information, please see license.txt
+
+"""Run-time benchmark for Booking Inquiry validation on large groups.
+
+    bench --site mysite.local execute tours_and_safaris.benchmarks.booking_inquiry_validation.run
+
+Inquiries are built in memory and never saved.
+"""
+
+import random
+import time
+
+import frappe
+from frappe.utils import add_days, today
+
+from tours_and_safaris.tours_and_safaris.doctype.booking_inquiry.booking_inquiry import validate_booking_inquiry
+
+# purpose_of_visit -> share of children in the group
+GROUPS = {
+    "Adventure Trips": 0.9,  # school trip
+    "Corporate - Team Building": 0.0,
+}
+
+
+def get_inquiry(guests, purpose, diets, seed=0):
+    rng = random.Random(seed)
+    children = int(guests * GROUPS[purpose])
+    guest_rows = [
+        {
+            "guest_name": f"Guest {i}",
+            "age": "Child" if i < children else "Adult",
+            "dietary_preference": rng.choice(diets) if diets and rng.random() < 0.3 else None,
+        }
+        for i in range(guests)
+    ]
+
+    return frappe.get_doc({
+        "doctype": "Booking Inquiry",
+        "purpose_of_visit": purpose,
+        "from_date": add_days(today(), 30),
+        "to_date": add_days(today(), 33),
+        "no_of_adults": guests - children,
+        "no_of_children": children,
+        "no_of_people": guests,
+        "guest_details": guest_rows,
+    })
+
+
+def run(guest_counts=(50, 200, 500, 1000), repeat=5):
+    """Time validate_booking_inquiry for school and corporate groups; logs and returns milliseconds."""
+    diets = frappe.get_all("Dietary Specifications", pluck="name")
+    logger = frappe.logger("tours_and_safaris")
+    results = []
+
+    for purpose in GROUPS:
+        for guests in guest_counts:
+            doc = get_inquiry(guests, purpose, diets)
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                validate_booking_inquiry(doc)
+                timings.append((time.perf_counter() - started) * 1000)
+
+            result = {
+                "purpose": purpose,
+                "guests": guests,
+                "best_ms": round(min(timings), 2),
+                "diet_rows": len(doc.diet_preferences),
+            }
+            results.append(result)
+            logger.info({"benchmark": "booking_inquiry_validation", **result})
+
+    return results
@@ -0,0 +1,57 @@
+# Copyright (c) 2025, wanguimbutu and contributors
+# For license information, please see license.txt
+
+"""Run-time benchmark for the group allocation planner on a synthetic property.
+
+    bench --site mysite.local execute tours_and_safaris.benchmarks.room_allocation.run
+"""
+
+import random
+import time
+
+import frappe
+
+from tours_and_safaris.tours_and_safaris.doctype.reservation.room_allocation import plan_allocation
+
+
+def get_units(rooms, seed=0):
+    rng = random.Random(seed)
+    units = [
+        {"kind": "Room", "capacity": rng.randint(1, 6), "price": rng.choice(range(40, 310, 10)),
+            "names": [f"ROOM-{i:04d}"]}
+        for i in range(rooms)
+    ]
+    units += [
+        {"kind": "Tent", "key": "Dome", "capacity": 2, "price": 45, "count": 40},
+        {"kind": "Tent", "key": "Safari", "capacity": 4, "price": 110, "count": 20},
+    ]
+
+    return units
+
+
+def run(rooms=500, party_sizes=(4, 20, 60, 150, 300), repeat=5):
+    """Time plan_allocation for each party size and objective; logs and returns milliseconds."""
+    units = get_units(rooms)
+    logger = frappe.logger("tours_and_safaris")
+    results = []
+
+    for party_size in party_sizes:
+        for objective in ("cheapest", "fewest_rooms"):
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                plan = plan_allocation(units, party_size, objective)
+                timings.append((time.perf_counter() - started) * 1000)
+
+            result = {
+                "rooms": rooms,
+                "party_size": party_size,
+                "objective": objective,
+                "best_ms": round(min(timings), 2),
+                "units": plan and plan["count"],
+                "price": plan and plan["price"],
+            }
+            results.append(result)
+            logger.info({"benchmark": "room_allocation", **result})
+
+    return results
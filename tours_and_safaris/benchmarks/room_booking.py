@@ -0,0 +1,111 @@
+# Copyright (c) 2025, wanguimbutu and contributors
+# For license information, please see license.txt
+
+"""Concurrency benchmark for reserve_rooms.
+
+Many worker threads, each with its own database connection, try to reserve
+random rooms for random overlapping stays at the same time. Afterwards the
+benchmark checks that no two reservations hold a room on the same night.
+"""
+
+import random
+import threading
+import time
+
+import frappe
+from frappe.utils import add_days, getdate
+
+ROOM_PREFIX = "_BENCH-ROOM-"
+RESERVATION_PREFIX = "_BENCH-RES-"
+
+
+def run(workers=16, attempts=50, rooms=10, rooms_per_booking=2, days=30, max_nights=5):
+    """Hammer reserve_rooms from `workers` threads; logs and returns throughput and double bookings."""
+    site = frappe.local.site
+    room_names = setup_rooms(rooms)
+    start_date = add_days(getdate(), 1)
+    results = {"reserved": 0, "conflicts": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def worker(worker_no):
+        frappe.init(site=site)
+        frappe.connect()
+        try:
+            from tours_and_safaris.tours_and_safaris.doctype.reservation.reservation import reserve_rooms
+
+            rng = random.Random(worker_no)
+            for attempt in range(attempts):
+                arrival = add_days(start_date, rng.randrange(days))
+                departure = add_days(arrival, rng.randint(1, max_nights))
+                try:
+                    result = reserve_rooms(
+                        f"{RESERVATION_PREFIX}{worker_no}-{attempt}",
+                        rng.sample(room_names, rooms_per_booking),
+                        arrival,
+                        departure,
+                    )
+                    outcome = "reserved" if result["reserved"] else "conflicts"
+                except Exception:
+                    frappe.db.rollback()
+                    outcome = "errors"
+                with lock:
+                    results[outcome] += 1
+        finally:
+            frappe.destroy()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    summary = {
+        **results,
+        "attempts": workers * attempts,
+        "seconds": round(elapsed, 3),
+        "attempts_per_second": round(workers * attempts / elapsed, 1),
+        "double_bookings": count_double_bookings(),
+    }
+    teardown()
+    frappe.logger("tours_and_safaris").info({"benchmark": "room_booking", **summary})
+
+    return summary
+
+
+def setup_rooms(count):
+    teardown()
+    room_names = []
+    for i in range(count):
+        room = frappe.get_doc({
+            "doctype": "Rooms",
+            "room_number": f"{ROOM_PREFIX}{i:03d}",
+            "status": "Available",
+            "capacity": 2,
+        }).insert(ignore_permissions=True)
+        room_names.append(room.name)
+    frappe.db.commit()
+
+    return room_names
+
+
+def count_double_bookings():
+    """Pairs of benchmark Availability rows from different reservations sharing a room night."""
+    return frappe.db.sql("""
+        SELECT COUNT(*)
+        FROM `tabAvailability` a
+        JOIN `tabAvailability` b
+            ON a.room_name = b.room_name
+            AND a.name < b.name
+            AND a.reservation != b.reservation
+            AND a.arrival_date < b.depature_date
+            AND a.depature_date > b.arrival_date
+        WHERE a.room_name LIKE %(prefix)s
+    """, {"prefix": f"{ROOM_PREFIX}%"})[0][0]
+
+
+def teardown():
+    frappe.db.delete("Availability", {"reservation": ["like", f"{RESERVATION_PREFIX}%"]})
+    frappe.db.delete("Rooms", {"name": ["like", f"{ROOM_PREFIX}%"]})
+    frappe.db.commit()
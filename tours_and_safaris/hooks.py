@@ -7,33 +7,67 @@ app_license = "mit"
 
 
 doc_events = {
-    "Maintenance Log": {
-        "on_submit": "tours_and_safaris.tours_and_safaris.doctype.booking.booking.on_submit_maintenance_log"
-    },
     "Reservation": {
-        "on_update": "tours_and_safaris.tours_and_safaris.doctype.reservation.reservation.update_room_availability"
+        "on_update": [
+            "tours_and_safaris.tours_and_safaris.doctype.reservation.reservation.update_room_availability",
+            "tours_and_safaris.tours_and_safaris.doctype.customer_match_key.customer_match_key.index_guest_contacts",
+            "tours_and_safaris.tours_and_safaris.doctype.guest_directory.guest_directory.index_booking_guests"
+        ],
+        "on_update_after_submit": "tours_and_safaris.tours_and_safaris.doctype.guest_directory.guest_directory.index_booking_guests",
+        "on_cancel": "tours_and_safaris.tours_and_safaris.doctype.guest_directory.guest_directory.remove_booking_guests",
+        "on_trash": [
+            "tours_and_safaris.tours_and_safaris.doctype.customer_match_key.customer_match_key.drop_keys",
+            "tours_and_safaris.tours_and_safaris.doctype.guest_directory.guest_directory.remove_booking_guests"
+        ]
     },
-    "Booking Inquiry": {
-        "validate":"tours_and_safaris.tours_and_safaris.doctype.booking_inquiry.booking_inquiry.validate_boking_inquiry"
+    "Customer": {
+        "on_update": "tours_and_safaris.tours_and_safaris.doctype.customer_match_key.customer_match_key.index_customer",
+        "on_trash": "tours_and_safaris.tours_and_safaris.doctype.customer_match_key.customer_match_key.drop_keys"
+    },
+    "Activity Type": {
+        "on_change": "tours_and_safaris.tours_and_safaris.doctype.reservation.reservation_pricing.clear_catalog_cache",
+        "on_trash": "tours_and_safaris.tours_and_safaris.doctype.reservation.reservation_pricing.clear_catalog_cache"
     },
-    "Booking Inquiry":{
-        "validate":"tours_and_safaris.tours_and_safaris.doctype.booking_inquiry.booking_inquiry.validate_people_count"
+    "Instructor": {
+        "on_change": "tours_and_safaris.tours_and_safaris.doctype.instructor_assignment.instructor_assignment.clear_instructor_index",
+        "on_trash": "tours_and_safaris.tours_and_safaris.doctype.instructor_assignment.instructor_assignment.clear_instructor_index"
     },
-    "Booking Inquiry":{
-        "validate":"tours_and_safaris.tours_and_safaris.doctype.booking_inquiry.booking_inquiry.validate_guest_details"
+    "Instructor Rate": {
+        "on_change": "tours_and_safaris.tours_and_safaris.doctype.instructor_assignment.instructor_assignment.clear_instructor_index",
+        "on_trash": "tours_and_safaris.tours_and_safaris.doctype.instructor_assignment.instructor_assignment.clear_instructor_index"
     },
-    "Booking Inquiry":{
-        "validate":"tours_and_safaris.tours_and_safaris.doctype.booking_inquiry.booking_inquiry.update_diet_preferences"
+    "Quotation": {
+        "on_change": "tours_and_safaris.tours_and_safaris.doctype.reservation.reservation.clear_form_bootstrap_cache",
+        "on_trash": "tours_and_safaris.tours_and_safaris.doctype.reservation.reservation.clear_form_bootstrap_cache"
+    },
+    "Booking Inquiry": {
+        "validate": "tours_and_safaris.tours_and_safaris.doctype.booking_inquiry.booking_inquiry.validate_booking_inquiry",
+        "on_update": [
+            "tours_and_safaris.tours_and_safaris.doctype.customer_match_key.customer_match_key.index_guest_contacts",
+            "tours_and_safaris.tours_and_safaris.doctype.guest_directory.guest_directory.index_booking_guests"
+        ],
+        "on_update_after_submit": "tours_and_safaris.tours_and_safaris.doctype.guest_directory.guest_directory.index_booking_guests",
+        "on_cancel": "tours_and_safaris.tours_and_safaris.doctype.guest_directory.guest_directory.remove_booking_guests",
+        "on_trash": [
+            "tours_and_safaris.tours_and_safaris.doctype.customer_match_key.customer_match_key.drop_keys",
+            "tours_and_safaris.tours_and_safaris.doctype.guest_directory.guest_directory.remove_booking_guests"
+        ]
     }
 }
 
 
 scheduler_events = {
     "daily": [
-        "tours_and_safaris.tours_and_safaris.doctype.availability.availability.update_room_status"
+        "tours_and_safaris.tours_and_safaris.doctype.availability.availability.update_room_status",
+        "tours_and_safaris.tours_and_safaris.doctype.equipment.equipment.run_inspection_schedule"
     ]
 }
 
+# Roles the app ships, e.g. for kitchen staff reading the Kitchen Meal Plan
+fixtures = [
+    {"dt": "Role", "filters": [["name", "in", ["Kitchen User"]]]}
+]
+
 
 
 # Apps
@@ -1,60 +1,328 @@
 # Copyright (c) 2025, wanguimbutu and contributors
 # For license information, please see license.txt
 
+import time
+
 import frappe
 from frappe.model.document import Document
-from datetime import datetime
+from frappe.utils import add_days, cint, date_diff, get_datetime, getdate, now_datetime
 
+from tours_and_safaris.utils import bulk_insert_docs, run_in_chunks
 
-class Availability(Document):
+from tours_and_safaris.tours_and_safaris.doctype.availability.availability_index import (
+    get_rooms_changed_since,
+    invalidate_reservation_rooms,
+    invalidate_rooms,
+)
+
+# Status codes used in the availability matrix; a higher code wins when rows overlap
+MATRIX_STATUS_CODES = {
+    "Available": 0,
+    "Checked Out": 0,
+    "Reserved": 1,
+    "Confirmed Reservation": 2,
+    "Booked": 3,
+    "Occupied": 4,
+    "Under Maintenance": 5,
+}
+MAX_MATRIX_DAYS = 90
+
+# Columns written by the bulk inserts, besides the standard ones
+AVAILABILITY_BULK_FIELDS = ("room_name", "tent_type", "reservation", "arrival_date", "depature_date", "status")
+CHECK_OUT_LOG_BULK_FIELDS = ("reservation", "customer_name", "check_out_datetime", "room_details", "status")
+
+# Availability statuses that hold a room against other reservations
+HOLDING_STATUSES = ("Reserved", "Confirmed Reservation", "Booked", "Occupied")
+
+
+class RoomConflictError(frappe.ValidationError):
     pass
+
+
+class Availability(Document):
+    def on_change(self):
+        self.invalidate_room_index()
+
+    def on_trash(self):
+        self.invalidate_room_index()
+
+    def invalidate_room_index(self):
+        """Drop the cached interval index for this row's room (and its previous room)."""
+        previous = self.get_doc_before_save()
+        invalidate_rooms(self.room_name, previous and previous.room_name)
+
+
+def on_doctype_update():
+    # Per-room date lookups: overlap checks, next arrival for housekeeping
+    frappe.db.add_index("Availability", ["room_name", "arrival_date"])
+
+
+def bulk_insert_availability(rows, docstatus=0):
+    """Insert many Availability rows with a single multi-row INSERT.
+
+    Names are generated up front, so no document hooks run; the affected rooms
+    are invalidated in the availability index instead. Returns the new names.
+    """
+    names = bulk_insert_docs("Availability", AVAILABILITY_BULK_FIELDS, rows, docstatus=docstatus)
+    invalidate_rooms(*[row.get("room_name") for row in rows])
+
+    return names
+
+
+def get_nightly_rows(reservation_name, room_names, arrival_date, depature_date, status="Reserved"):
+    """One Availability row per room per night, from arrival up to (not including) departure."""
+    arrival_date, depature_date = getdate(arrival_date), getdate(depature_date)
+    nights = max(date_diff(depature_date, arrival_date), 1)
+
+    return [
+        {
+            "room_name": room_name,
+            "reservation": reservation_name,
+            "arrival_date": add_days(arrival_date, night),
+            "depature_date": add_days(arrival_date, night + 1),
+            "status": status,
+        }
+        for room_name in room_names
+        for night in range(nights)
+    ]
+
+
+def delete_availability(reservation_name, room_names=None):
+    """Delete a reservation's Availability rows, optionally only for some rooms, in one statement."""
+    filters = {"reservation": reservation_name}
+    if room_names:
+        filters["room_name"] = ["in", list(room_names)]
+        invalidate_rooms(*room_names)
+    else:
+        invalidate_reservation_rooms(reservation_name)
+
+    frappe.db.delete("Availability", filters)
+
+
+def lock_rooms(room_names):
+    """Lock the Rooms rows until the transaction ends; returns the rooms that exist.
+
+    Rows are locked in name order so concurrent bookings of overlapping room
+    sets cannot deadlock.
+    """
+    return frappe.db.sql("""
+        SELECT name FROM `tabRooms`
+        WHERE name IN %(rooms)s
+        ORDER BY name
+        FOR UPDATE
+    """, {"rooms": list(room_names)}, pluck=True)
+
+
+def get_room_conflicts(room_names, arrival_date, depature_date, reservation_name=None):
+    """Rows of other reservations holding any of the rooms between arrival and departure."""
+    return frappe.db.sql("""
+        SELECT room_name, reservation, arrival_date, depature_date, status
+        FROM `tabAvailability`
+        WHERE room_name IN %(rooms)s
+            AND docstatus < 2
+            AND status IN %(statuses)s
+            AND arrival_date < %(depature_date)s
+            AND depature_date > %(arrival_date)s
+            AND IFNULL(reservation, '') != %(reservation)s
+        ORDER BY room_name, arrival_date
+    """, {
+        "rooms": list(room_names),
+        "statuses": HOLDING_STATUSES,
+        "arrival_date": get_datetime(arrival_date),
+        "depature_date": get_datetime(depature_date),
+        "reservation": reservation_name or "",
+    }, as_dict=True)
+
+
+def lock_and_check_rooms(room_names, arrival_date, depature_date, reservation_name=None):
+    """Lock the rooms and return a conflict list (empty when every room is free).
+
+    Unknown rooms are reported as conflicts with no reservation.
+    """
+    room_names = list(room_names)
+    existing = set(lock_rooms(room_names))
+    conflicts = [
+        frappe._dict(room_name=room_name, reservation=None, status="Missing")
+        for room_name in room_names if room_name not in existing
+    ]
+
+    return conflicts + get_room_conflicts(room_names, arrival_date, depature_date, reservation_name)
+
+
+def format_room_conflicts(conflicts):
+    return "<br>".join(
+        f"Room {conflict.room_name} does not exist" if conflict.status == "Missing"
+        else f"Room {conflict.room_name} is {conflict.status} for {conflict.reservation} "
+        f"({conflict.arrival_date} to {conflict.depature_date})"
+        for conflict in conflicts
+    )
+
+
+def ensure_rooms_free(room_names, arrival_date, depature_date, reservation_name=None):
+    """Lock the rooms and throw RoomConflictError if any is held by another reservation."""
+    if not room_names:
+        return
+
+    conflicts = lock_and_check_rooms(room_names, arrival_date, depature_date, reservation_name)
+    if conflicts:
+        frappe.throw(format_room_conflicts(conflicts), RoomConflictError, title="Rooms not available")
+
+
 @frappe.whitelist()
-def update_room_status(self):
-    today = datetime.today().date()
-
-    # Fetch all availability records where check-in date is today and status is "Booked"
-    availability_entries = frappe.get_all(
-        "Availability",
-        filters={"arrival_date": today, "status": "Booked"},
-        fields=["name", "room_name"]
+def get_availability_matrix(start_date, days=30, room_type=None, start=0, page_length=50, changed_since=None):
+    """Return a rooms x nights grid of status codes for the calendar view.
+
+    Rooms are paged in (room_type, room_number) order. Each row of `matrix` is a
+    string with one status digit per night. Pass the previous response's `as_of`
+    as `changed_since` to receive only the rooms whose calendar changed since.
+    """
+    start_date = getdate(start_date)
+    days, start, page_length = cint(days), cint(start), cint(page_length)
+    if not 0 < days <= MAX_MATRIX_DAYS:
+        frappe.throw(f"Days must be between 1 and {MAX_MATRIX_DAYS}.")
+
+    end_date = add_days(start_date, days)
+    as_of = time.time()
+
+    room_filters = {}
+    if room_type:
+        room_filters["room_type"] = room_type
+    rooms = frappe.get_all(
+        "Rooms",
+        filters=room_filters,
+        fields=["name", "room_type"],
+        order_by="room_type asc, name asc",
+        start=start,
+        page_length=page_length,
     )
+    next_start = start + page_length if len(rooms) == page_length else None
+
+    if changed_since:
+        changed = get_rooms_changed_since([room.name for room in rooms], changed_since)
+        if changed is not None:
+            changed = set(changed)
+            rooms = [room for room in rooms if room.name in changed]
+
+    grid = {room.name: [0] * days for room in rooms}
+    if rooms:
+        # One query for every Availability row touching the window on this page
+        rows = frappe.db.sql("""
+            SELECT room_name, arrival_date, depature_date, status
+            FROM `tabAvailability`
+            WHERE room_name IN %(rooms)s
+                AND docstatus < 2
+                AND arrival_date < %(end_date)s
+                AND depature_date >= %(start_date)s
+        """, {"rooms": list(grid), "start_date": start_date, "end_date": end_date}, as_dict=True)
+
+        for row in rows:
+            code = MATRIX_STATUS_CODES.get(row.status, 0)
+            if not code:
+                continue
+            arrival, departure = getdate(row.arrival_date), getdate(row.depature_date)
+            # A row covers the nights from arrival up to (not including) departure;
+            # a same-day row covers its arrival night
+            departure = max(departure, add_days(arrival, 1))
+            first = max(date_diff(arrival, start_date), 0)
+            last = min(date_diff(departure, start_date), days)
+            cells = grid[row.room_name]
+            for night in range(first, last):
+                if code > cells[night]:
+                    cells[night] = code
+
+    return {
+        "start_date": start_date,
+        "days": days,
+        "rooms": [room.name for room in rooms],
+        "room_types": [room.room_type for room in rooms],
+        "matrix": ["".join(map(str, grid[room.name])) for room in rooms],
+        "statuses": MATRIX_STATUS_CODES,
+        "next_start": next_start,
+        "as_of": as_of,
+    }
+
+@frappe.whitelist()
+def update_room_status(chunk_size=None):
+    """Daily job: move today's Booked arrivals to Reserved, chunk by chunk."""
+    today = getdate()
+
+    def fetch_chunk(limit):
+        # Fetch availability records where check-in date is today and status is "Booked"
+        return frappe.db.sql("""
+            SELECT name, room_name
+            FROM `tabAvailability`
+            WHERE status = 'Booked'
+                AND arrival_date >= %(today)s AND arrival_date < %(tomorrow)s
+            ORDER BY name
+            LIMIT %(limit)s
+        """, {"today": today, "tomorrow": add_days(today, 1), "limit": limit}, as_dict=True)
+
+    def process_chunk(entries):
+        room_names = list({entry.room_name for entry in entries if entry.room_name})
 
-    for entry in availability_entries:
         # Update Availability status to Reserved
-        frappe.db.set_value("Availability", entry["name"], "status", "Reserved")
+        set_availability_status([entry.name for entry in entries], "Reserved")
 
         # Also update the Room status
-        frappe.db.set_value("Rooms", entry["room_number"], "status", "Reserved")
+        set_room_status(room_names, "Reserved")
+        invalidate_rooms(*room_names)
+
+    return run_in_chunks("update_room_status", fetch_chunk, process_chunk, chunk_size)
 
-    frappe.db.commit()
-    
 @frappe.whitelist()
-def process_checkout():
-    today = datetime.today().date()
-    checkout_time = today.strftime("%Y-%m-%d") + " 10:00:00"  # Set to 10 AM
-
-    # Fetch all rooms with check-out today
-    availability_entries = frappe.get_all(
-        "Availability",
-        filters={"depature_date": today, "status": "Reserved"},
-        fields=["name", "room_name"]
-    )
+def process_checkout(chunk_size=None):
+    """Check out today's departures: log them, flag rooms for maintenance and close their availability."""
+    today = getdate()
+    checkout_time = get_datetime(f"{today} 10:00:00")  # Set to 10 AM
+
+    def fetch_chunk(limit):
+        # Fetch all rooms with check-out today
+        return frappe.db.sql("""
+            SELECT availability.name, availability.room_name, availability.reservation,
+                reservation.customer_name
+            FROM `tabAvailability` availability
+            LEFT JOIN `tabReservation` reservation ON reservation.name = availability.reservation
+            WHERE availability.status = 'Reserved'
+                AND availability.depature_date >= %(today)s AND availability.depature_date < %(tomorrow)s
+            ORDER BY availability.name
+            LIMIT %(limit)s
+        """, {"today": today, "tomorrow": add_days(today, 1), "limit": limit}, as_dict=True)
+
+    def process_chunk(entries):
+        room_names = list({entry.room_name for entry in entries if entry.room_name})
 
-    for entry in availability_entries:
-        # Create a checkout log
-        checkout_log = frappe.get_doc({
-            "doctype": "Checkout Log",
-            "room_name": entry["room_name"],
-            "checkout_date": today,
-            "checkout_time": checkout_time,
-            "status": "Checked Out"
-        })
-        checkout_log.insert(ignore_permissions=True)
+        # Checkout logs, rooms and availability flip in the same commit, so a
+        # re-run after a crash never logs a departure twice
+        bulk_insert_docs("Check Out Log", CHECK_OUT_LOG_BULK_FIELDS, [
+            {
+                "reservation": entry.reservation,
+                "customer_name": entry.customer_name,
+                "check_out_datetime": checkout_time,
+                "room_details": entry.room_name,
+                "status": "Completed",
+            }
+            for entry in entries
+        ])
+        set_room_status(room_names, "Under Maintenance")
+        set_availability_status([entry.name for entry in entries], "Checked Out")
+        invalidate_rooms(*room_names)
 
-        # Update Room Status to "Under Maintenance"
-        frappe.db.set_value("Rooms", entry["room_number"], "status", "Under Maintenance")
+    return run_in_chunks("process_checkout", fetch_chunk, process_chunk, chunk_size)
 
-        # Update Availability Status
-        frappe.db.set_value("Availability", entry["name"], "status", "Checked Out")
+def set_availability_status(names, status):
+    """Set the status of many Availability rows in one statement."""
+    if names:
+        frappe.db.sql("""
+            UPDATE `tabAvailability`
+            SET status = %(status)s, modified = %(now)s
+            WHERE name IN %(names)s
+        """, {"status": status, "now": now_datetime(), "names": names})
 
-    frappe.db.commit()
+def set_room_status(room_names, status):
+    """Set the status of many Rooms in one statement."""
+    if room_names:
+        frappe.db.sql("""
+            UPDATE `tabRooms`
+            SET status = %(status)s, modified = %(now)s
+            WHERE name IN %(names)s
+        """, {"status": status, "now": now_datetime(), "names": room_names})
@@ -0,0 +1,194 @@
+# Copyright (c) 2025, wanguimbutu and contributors
+# For license information, please see license.txt
+
+"""Per-room interval index over Availability rows.
+
+Each room's Availability ranges are grouped by status and kept sorted by
+arrival date together with a running maximum of departure dates, so an
+overlap check is a single bisect. Entries live in the redis cache, are
+loaded lazily for the rooms a query touches and are dropped whenever an
+Availability row for that room changes.
+"""
+
+import pickle
+import time
+from bisect import bisect_right
+
+import frappe
+from frappe.utils import get_datetime, getdate
+
+INDEX_CACHE_KEY = "tours_and_safaris:room_availability_index"
+# room -> epoch seconds of the last Availability change, for incremental refresh
+CHANGES_CACHE_KEY = "tours_and_safaris:room_availability_changes"
+# Field of CHANGES_CACHE_KEY holding when change tracking started; earlier changes are unknown
+TRACKED_SINCE_FIELD = "__tracked_since__"
+
+# Statuses that make a room unavailable in get_available_rooms
+BOOKED_STATUSES = ("Booked",)
+
+
+def to_datetime(value):
+    """Normalise a date/datetime argument the way the SQL filters compare it."""
+    return get_datetime(getdate(value))
+
+
+def build_room_index(rows):
+    """Build {status: (arrival_dates, max_depature_dates)} for one room's rows."""
+    by_status = {}
+    for row in rows:
+        if not row.get("arrival_date") or not row.get("depature_date"):
+            continue
+        by_status.setdefault(row.get("status"), []).append(
+            (get_datetime(row.get("arrival_date")), get_datetime(row.get("depature_date")))
+        )
+
+    index = {}
+    for status, ranges in by_status.items():
+        ranges.sort()
+        starts, max_ends = [], []
+        running_max = None
+        for start, end in ranges:
+            running_max = end if running_max is None else max(running_max, end)
+            starts.append(start)
+            max_ends.append(running_max)
+        index[status] = (starts, max_ends)
+
+    return index
+
+
+def is_room_blocked(room_index, arrival_date, depature_date, statuses=BOOKED_STATUSES):
+    """Return True if any range with one of `statuses` overlaps the given dates.
+
+    Matches the inclusive overlap used by the original query:
+    ``arrival_date <= depature_date and depature_date >= arrival_date``.
+    """
+    if not room_index:
+        return False
+
+    for status in statuses:
+        if status not in room_index:
+            continue
+        starts, max_ends = room_index[status]
+        # Ranges that start on or before the requested departure
+        i = bisect_right(starts, depature_date)
+        if i and max_ends[i - 1] >= arrival_date:
+            return True
+
+    return False
+
+
+def hmget(cache_key, fields):
+    """Values of many fields of a cache hash in one round trip, None where missing.
+
+    Reads the redis hash directly, so the key is prefixed and the values
+    unpickled the way frappe.cache().hset stores them.
+    """
+    if not fields:
+        return []
+
+    cache = frappe.cache()
+    return [
+        pickle.loads(value) if value is not None else None
+        for value in cache.hmget(cache.make_key(cache_key), fields)
+    ]
+
+
+def get_room_indexes(room_names):
+    """Return {room_name: room_index}, reading cached rooms in one round trip and loading the rest in one query."""
+    room_names = list(room_names)
+    cache = frappe.cache()
+    indexes, missing = {}, []
+
+    for room_name, room_index in zip(room_names, hmget(INDEX_CACHE_KEY, room_names)):
+        if room_index is None:
+            missing.append(room_name)
+        else:
+            indexes[room_name] = room_index
+
+    if missing:
+        rows_by_room = {room_name: [] for room_name in missing}
+        for row in frappe.get_all(
+            "Availability",
+            filters={"room_name": ["in", missing]},
+            fields=["room_name", "arrival_date", "depature_date", "status"],
+        ):
+            rows_by_room[row.room_name].append(row)
+
+        for room_name, rows in rows_by_room.items():
+            indexes[room_name] = build_room_index(rows)
+            cache.hset(INDEX_CACHE_KEY, room_name, indexes[room_name])
+
+    return indexes
+
+
+def get_free_rooms(arrival_date, depature_date, room_type=None, statuses=BOOKED_STATUSES):
+    """Rooms marked Available that have no `statuses` range overlapping the dates."""
+    arrival_date, depature_date = to_datetime(arrival_date), to_datetime(depature_date)
+
+    filters = {"status": "Available"}
+    if room_type:
+        filters["room_type"] = room_type
+
+    rooms = frappe.get_all("Rooms", filters=filters, fields=["room_number", "capacity", "base_price"])
+    indexes = get_room_indexes([room.room_number for room in rooms])
+
+    return [
+        room for room in rooms
+        if not is_room_blocked(indexes.get(room.room_number), arrival_date, depature_date, statuses)
+    ]
+
+
+def invalidate_rooms(*room_names):
+    """Drop the cached index for the given rooms, now and again once the transaction commits."""
+    room_names = {room_name for room_name in room_names if room_name}
+    if not room_names:
+        return
+
+    def _drop():
+        cache = frappe.cache()
+        changed_at = time.time()
+        if not cache.hexists(CHANGES_CACHE_KEY, TRACKED_SINCE_FIELD):
+            cache.hset(CHANGES_CACHE_KEY, TRACKED_SINCE_FIELD, changed_at)
+        for room_name in room_names:
+            cache.hdel(INDEX_CACHE_KEY, room_name)
+            cache.hset(CHANGES_CACHE_KEY, room_name, changed_at)
+
+    _drop()
+    # Another worker may rebuild the entry from pre-commit data in between
+    frappe.db.after_commit.add(_drop)
+
+
+def invalidate_reservation_rooms(reservation_name):
+    """Drop the cached index for every room that has Availability rows for a reservation."""
+    invalidate_rooms(*frappe.get_all(
+        "Availability",
+        filters={"reservation": reservation_name},
+        pluck="room_name",
+        distinct=True,
+    ))
+
+
+def get_rooms_changed_since(room_names, changed_since):
+    """Subset of `room_names` whose Availability rows changed after `changed_since` (epoch seconds).
+
+    Returns None when the history does not reach back to `changed_since`
+    (nothing tracked yet, or the cache was flushed since), meaning every room
+    has to be treated as changed.
+    """
+    room_names = list(room_names)
+    # One round trip for the tracking start and every room
+    tracked_since, *changed_at = hmget(CHANGES_CACHE_KEY, [TRACKED_SINCE_FIELD, *room_names])
+
+    changed_since = float(changed_since)
+    if tracked_since is None or changed_since < tracked_since:
+        return None
+
+    return [
+        room_name for room_name, room_changed_at in zip(room_names, changed_at)
+        if (room_changed_at or 0) > changed_since
+    ]
+
+
+def clear_index():
+    """Drop the whole index; it is rebuilt lazily on the next query."""
+    frappe.cache().delete_value(INDEX_CACHE_KEY)
@@ -1,9 +1,55 @@
 # Copyright (c) 2025, wanguimbutu and Contributors
 # See license.txt
 
-# import frappe
+import time
+
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from tours_and_safaris.tours_and_safaris.doctype.availability.availability_index import (
+	CHANGES_CACHE_KEY,
+	build_room_index,
+	get_rooms_changed_since,
+	invalidate_rooms,
+	is_room_blocked,
+	to_datetime,
+)
+
 
 class TestAvailability(FrappeTestCase):
-	pass
+	def test_room_index_overlap_is_inclusive(self):
+		index = build_room_index([
+			{"arrival_date": "2025-03-01", "depature_date": "2025-03-20", "status": "Booked"},
+			{"arrival_date": "2025-03-05", "depature_date": "2025-03-07", "status": "Booked"},
+			{"arrival_date": "2025-04-01", "depature_date": "2025-04-03", "status": "Reserved"},
+		])
+
+		def blocked(arrival, departure, statuses=("Booked",)):
+			return is_room_blocked(index, to_datetime(arrival), to_datetime(departure), statuses)
+
+		# A long range is not hidden by a shorter one that starts later
+		self.assertTrue(blocked("2025-03-15", "2025-03-16"))
+		self.assertTrue(blocked("2025-03-20", "2025-03-25"))
+		self.assertTrue(blocked("2025-02-25", "2025-03-01"))
+		self.assertFalse(blocked("2025-03-21", "2025-03-31"))
+
+		# Only the requested statuses block
+		self.assertFalse(blocked("2025-04-02", "2025-04-02"))
+		self.assertTrue(blocked("2025-04-02", "2025-04-02", ("Booked", "Reserved")))
+
+	def test_empty_room_index_is_free(self):
+		self.assertFalse(is_room_blocked({}, to_datetime("2025-01-01"), to_datetime("2025-01-02")))
+
+	def test_rooms_changed_since_needs_history(self):
+		frappe.cache().delete_value(CHANGES_CACHE_KEY)
+		before_tracking = time.time() - 60
+		self.assertIsNone(get_rooms_changed_since(["_Test Room A"], before_tracking))
+
+		invalidate_rooms("_Test Room A")
+		# Tracking started after the client's last sync, so nothing can be ruled out
+		self.assertIsNone(get_rooms_changed_since(["_Test Room A", "_Test Room B"], before_tracking))
+
+		synced = time.time()
+		self.assertEqual(get_rooms_changed_since(["_Test Room A", "_Test Room B"], synced), [])
+		invalidate_rooms("_Test Room B")
+		self.assertEqual(get_rooms_changed_since(["_Test Room A", "_Test Room B"], synced), ["_Test Room B"])
@@ -143,29 +143,53 @@ function toggle_transport_option(frm){
 
 
 function create_reservation(frm) {
-    frappe.model.with_doctype("Reservation", function() {
-        let reservation = frappe.model.get_new_doc("Reservation");
-
-        reservation.booking_inquiry = frm.doc.name;
-        reservation.customer_name = frm.doc.customer_name;
-        reservation.status = "Reserved";
-        reservation.no_of_people = frm.doc.no_of_people; 
-        reservation.no_of_adults = frm.doc.no_of_adults;
-        reservation.no_of_children = frm.doc.no_of_children;
-        reservation.arrival_date = frm.doc.from_date;  
-        reservation.depature_date = frm.doc.to_date; 
-        reservation.activity = frm.doc.purpose_of_visit;
-        reservation.guest_details = frm.doc.guest_details;
-        reservation.activities =frm.doc.activities;
-        reservation.tent_selection = frm.doc.tent_selection;
-        reservation.room_booking = frm.doc.room_booking;
-        reservation.transport = frm.doc.transport_service;
-        reservation.accommodation_needed = frm.doc.accommodation_needed;
-        reservation.rooms = frm.doc.rooms;
-        reservation.tents = frm.doc.tents;
-        reservation.dietary_requirements = frm.doc.dietary_preferences;
-
-        frappe.set_route("Form", "Reservation", reservation.name);
+    // Offer existing look-alike customers before a new one is made from the Lead
+    frappe.call({
+        method: "tours_and_safaris.tours_and_safaris.doctype.booking_inquiry.booking_inquiry.get_inquiry_customer_matches",
+        args: { booking_inquiry: frm.doc.name },
+        callback: function(r) {
+            let matches = r.message || [];
+            if (!matches.length) {
+                make_reservation(frm);
+                return;
+            }
+
+            let new_customer = __("Create a new Customer");
+            let options = matches.map(match =>
+                `${match.customer}: ${match.customer_name} (${match.matched_on.join(", ")})`);
+
+            frappe.prompt([
+                {
+                    fieldname: "customer",
+                    label: __("Possible existing Customer"),
+                    fieldtype: "Select",
+                    options: [...options, new_customer].join("\n"),
+                    default: options[0],
+                    reqd: 1
+                }
+            ],
+            function(values) {
+                let index = options.indexOf(values.customer);
+                make_reservation(frm, index >= 0 ? matches[index].customer : null);
+            },
+            __("This guest may already be a Customer"),
+            __("Create Reservation"));
+        }
+    });
+}
+
+function make_reservation(frm, customer) {
+    // Customer and Reservation are created server-side in one transaction
+    frappe.call({
+        method: "tours_and_safaris.tours_and_safaris.doctype.booking_inquiry.booking_inquiry.make_reservation",
+        args: { booking_inquiry: frm.doc.name, customer: customer },
+        freeze: true,
+        freeze_message: __("Creating Reservation..."),
+        callback: function(r) {
+            if (r.message) {
+                frappe.set_route("Form", "Reservation", r.message.reservation);
+            }
+        }
     });
 }
 
@@ -188,37 +212,6 @@ function set_as_lost(frm) {
     __("Confirm"));
 }
 
-function handle_reservation_creation(frm) {
-    if (frm.doc.new_customer) {
-        // If it's a new customer, first convert the Lead to a Customer
-        convert_lead_to_customer(frm.doc.customer_name, function(customer_name) {
-            frm.set_value("customer_name", customer_name); // Update Booking Inquiry
-            frm.save();  // Save the form after updating
-            create_reservation(frm); // Now create the reservation
-        });
-    } else {
-        // If it's an existing customer, directly create the reservation
-        create_reservation(frm);
-    }
-}
-
-function convert_lead_to_customer(lead_name, callback) {
-    frappe.call({
-        method: "frappe.client.insert",
-        args: {
-            doc: {
-                doctype: "Customer",
-                customer_name: lead_name
-            }
-        },
-        callback: function(res) {
-            if (res.message) {
-                frappe.msgprint(__('Lead converted to Customer: ' + res.message.name));
-                callback(res.message.name);
-            }
-        }
-    });
-}
 function disable_form_actions(frm) {
     frm.disable_save();  
     frm.set_df_property("reason_for_cancellation", "read_only", 1);
@@ -3,67 +3,240 @@
 
 import frappe
 from frappe.model.document import Document
-from frappe.utils import today, getdate
+from frappe.utils import cint, get_datetime, getdate, today
 from collections import Counter
 
+from tours_and_safaris.tours_and_safaris.doctype.customer_match_key.customer_match_key import (
+    find_matches,
+    is_same_customer,
+)
+
 
 class BookingInquiry(Document):
 	pass
 
-@frappe.whitelist()
-def validate_booking_inquiry(doc, method):
-    if doc.from_date and getdate(doc.from_date) < getdate(today()):
-         frappe.throw(("From Date cannot be in the past. Please select a valid date."))
-         
-@frappe.whitelist()
-def validate_people_count(doc, method):
-    no_of_adults = doc.get("no_of_adults") or 0
-    no_of_children = doc.get("no_of_children") or 0
-    total = no_of_adults + no_of_children
 
-    if doc.get("no_of_people") != total:
-         frappe.throw("No of People must equal the sum of No of Adults and No of Children.")
+def summarize_guests(guests):
+    """Walk the guest rows once: adult and child counts and diet counts."""
+    summary = frappe._dict(adults=0, children=0, diets=Counter())
 
-@frappe.whitelist()
-def validate_guest_details(doc, method):
-    # Initialize counters
-    guest_adults = 0
-    guest_children = 0
-
-    # Loop through the guest_details child table
-    for guest in doc.get("guest_details") or []:
-        if guest.age and guest.age.lower() == "adult":
-            guest_adults += 1
-        elif guest.age and guest.age.lower() == "child":
-            guest_children += 1
-
-    no_of_adults = doc.get("no_of_adults") or 0
-    no_of_children = doc.get("no_of_children") or 0
-
-    if guest_adults != no_of_adults:
-        frappe.throw(
-            "Mismatch in Adults: Guest Details has {} adults, but 'No of Adults' is set to {}.".format(guest_adults, no_of_adults)
+    for guest in guests:
+        age = (guest.age or "").lower()
+        if age == "adult":
+            summary.adults += 1
+        elif age == "child":
+            summary.children += 1
+
+        if guest.dietary_preference:
+            summary.diets[guest.dietary_preference] += 1
+
+    return summary
+
+
+def get_date_errors(doc):
+    errors = []
+    # Only checked when the date is set or moved, so older inquiries can still be edited
+    if doc.from_date and (doc.is_new() or doc.has_value_changed("from_date")):
+        if getdate(doc.from_date) < getdate(today()):
+            errors.append("From Date cannot be in the past. Please select a valid date.")
+    if doc.from_date and doc.to_date and get_datetime(doc.to_date) < get_datetime(doc.from_date):
+        errors.append("To Date cannot be before From Date.")
+
+    return errors
+
+
+def get_people_count_errors(doc, summary):
+    no_of_adults = cint(doc.get("no_of_adults"))
+    no_of_children = cint(doc.get("no_of_children"))
+    errors = []
+
+    if cint(doc.get("no_of_people")) != no_of_adults + no_of_children:
+        errors.append("No of People must equal the sum of No of Adults and No of Children.")
+
+    if not doc.get("guest_details"):
+        return errors
+
+    if summary.adults != no_of_adults:
+        errors.append(
+            "Mismatch in Adults: Guest Details has {} adults, but 'No of Adults' is set to {}.".format(summary.adults, no_of_adults)
         )
-    if guest_children != no_of_children:
-        frappe.throw(
-            "Mismatch in Children: Guest Details has {} children, but 'No of Children' is set to {}.".format(guest_children, no_of_children)
+    if summary.children != no_of_children:
+        errors.append(
+            "Mismatch in Children: Guest Details has {} children, but 'No of Children' is set to {}.".format(summary.children, no_of_children)
         )
 
-@frappe.whitelist()
-def update_diet_preferences(doc, method):
-    """Update Diet Preferences child table based on Guest Details in Booking Inquiry."""
+    return errors
+
+
+def set_diet_preferences(doc, diets):
+    """Rebuild the Diet Preferences table from the guest diet counts."""
     if not doc.get("guest_details"):
         return
 
-    # Count dietary preferences from guest details
-    diet_count = Counter([guest.dietary_preference for guest in doc.get("guest_details") if guest.dietary_preference])
+    doc.set("diet_preferences", [
+        {"dietary_preference": preference, "total_people": count}
+        for preference, count in diets.items()
+    ])
+
+
+def validate_booking_inquiry(doc, method=None):
+    """Booking Inquiry validate hook: every check from one pass over the guests, all problems reported together."""
+    summary = summarize_guests(doc.get("guest_details") or [])
+
+    set_diet_preferences(doc, summary.diets)
+
+    errors = get_date_errors(doc) + get_people_count_errors(doc, summary)
+    if errors:
+        frappe.throw("<br>".join(errors), title="Please correct the Booking Inquiry")
+
+
+# Booking Inquiry table -> Reservation table, both using the same child doctype
+RESERVATION_TABLES = {
+    "guest_details": "guest_details",
+    "room_booking": "room_booking",
+    "tent_selection": "tent_selection",
+    "transport_service": "transport",
+    "hired_service": "hired_services",
+    "activities": "activities",
+}
+
+
+def get_lead_matches(inquiry, limit=5):
+    """Existing Customers that look like the inquiry's Lead, judged by name, email and phone."""
+    lead = frappe.db.get_value(
+        "Lead", inquiry.lead_name, ["lead_name", "company_name", "email_id", "mobile_no", "phone"], as_dict=True
+    )
+    if not lead:
+        return []
+
+    return find_matches(
+        lead.company_name or lead.lead_name, lead.email_id, lead.mobile_no or lead.phone, limit
+    )
+
+
+def resolve_customer(inquiry, customer=None, auto_match=False):
+    """The Customer for an inquiry: the one given, the inquiry's own, or the one for its Lead.
+
+    With `auto_match`, a Lead without a Customer is linked to an existing
+    Customer whose own email or phone it shares instead of creating a new
+    one. Name and guest-contact matches never link automatically.
+    """
+    if customer:
+        if not frappe.db.exists("Customer", customer):
+            frappe.throw("Customer {} does not exist.".format(customer))
+        return customer
+
+    if inquiry.customer_name and frappe.db.exists("Customer", inquiry.customer_name):
+        return inquiry.customer_name
+
+    if not inquiry.lead_name:
+        frappe.throw("Please set a Customer or a Lead on Booking Inquiry {}.".format(inquiry.name))
+
+    customer = frappe.db.get_value("Customer", {"lead_name": inquiry.lead_name}, "name")
+    if customer:
+        return customer
+
+    if auto_match:
+        for match in get_lead_matches(inquiry):
+            if is_same_customer(match):
+                return match["customer"]
+
+    lead = frappe.db.get_value("Lead", inquiry.lead_name, ["lead_name", "company_name"], as_dict=True)
+    return frappe.get_doc({
+        "doctype": "Customer",
+        "customer_name": lead.company_name or lead.lead_name or inquiry.lead_name,
+        "customer_type": "Company" if lead.company_name else "Individual",
+        "lead_name": inquiry.lead_name,
+    }).insert().name
+
+
+def get_reservation_doc(inquiry, customer):
+    """New Reservation for a Booking Inquiry with its guests, accommodation, transport, services and activities."""
+    activities = frappe.get_meta("Reservation").get_options("activity").split("\n")
+    reservation = frappe.get_doc({
+        "doctype": "Reservation",
+        "booking_inquiry": inquiry.name,
+        "customer_name": customer,
+        "status": "Reserved",
+        "no_of_people": inquiry.no_of_people,
+        "no_of_adults": inquiry.no_of_adults,
+        "no_of_children": inquiry.no_of_children,
+        "arrival_date": inquiry.from_date,
+        "depature_date": inquiry.to_date,
+        "activity": inquiry.purpose_of_visit if inquiry.purpose_of_visit in activities else None,
+        "accommodation_needed": inquiry.accommodation_needed,
+        "rooms": inquiry.rooms,
+        "tents": inquiry.tents,
+    })
+
+    for inquiry_table, reservation_table in RESERVATION_TABLES.items():
+        for row in inquiry.get(inquiry_table) or []:
+            reservation.append(reservation_table, row.as_dict(no_default_fields=True))
+
+    return reservation
+
+
+def convert_inquiry(booking_inquiry, customer=None, auto_match=False):
+    """Create the Customer (if needed) and the Reservation for one submitted inquiry."""
+    inquiry = frappe.get_doc("Booking Inquiry", booking_inquiry, for_update=True)
+    if inquiry.docstatus != 1:
+        frappe.throw("Booking Inquiry {} must be submitted first.".format(inquiry.name))
+    if inquiry.status == "Lost":
+        frappe.throw("Booking Inquiry {} is marked as Lost.".format(inquiry.name))
+
+    # Converting twice returns the first Reservation instead of a duplicate
+    existing = frappe.db.get_value(
+        "Reservation", {"booking_inquiry": inquiry.name, "docstatus": ["<", 2]}, ["name", "customer_name"]
+    )
+    if existing:
+        return {"reservation": existing[0], "customer": existing[1]}
+
+    customer = resolve_customer(inquiry, customer, auto_match)
+    reservation = get_reservation_doc(inquiry, customer).insert()
+
+    inquiry.db_set({"customer_name": customer, "status": "Reserved"})
+
+    return {"reservation": reservation.name, "customer": customer}
+
+
+@frappe.whitelist()
+def get_inquiry_customer_matches(booking_inquiry):
+    """Existing Customers the inquiry's Lead may already be, to offer before a new Customer is created."""
+    inquiry = frappe.get_doc("Booking Inquiry", booking_inquiry)
+    if inquiry.customer_name and frappe.db.exists("Customer", inquiry.customer_name):
+        return []
+    if not inquiry.lead_name or frappe.db.exists("Customer", {"lead_name": inquiry.lead_name}):
+        return []
+
+    return get_lead_matches(inquiry)
+
+
+@frappe.whitelist()
+def make_reservation(booking_inquiry, customer=None):
+    """Convert a Booking Inquiry to a Reservation in one request; nothing is kept if any step fails.
+
+    `customer` links an existing Customer, e.g. one picked from
+    get_inquiry_customer_matches, instead of creating one from the Lead.
+    """
+    return convert_inquiry(booking_inquiry, customer)
+
+
+@frappe.whitelist()
+def make_reservations(booking_inquiries):
+    """Convert many Booking Inquiries; each one is all-or-nothing and failures are reported per inquiry.
+
+    Leads are linked to an existing Customer with the same email or phone
+    (the Customer's own, not a past guest's) rather than creating a duplicate.
+    """
+    created, errors = {}, {}
 
-    # Clear existing diet preferences to prevent duplicates
-    doc.set("diet_preferences", [])
+    for booking_inquiry in dict.fromkeys(frappe.parse_json(booking_inquiries)):
+        frappe.db.savepoint("make_reservation")
+        try:
+            created[booking_inquiry] = convert_inquiry(booking_inquiry, auto_match=True)
+        except Exception as e:
+            frappe.db.rollback(save_point="make_reservation")
+            errors[booking_inquiry] = str(e)
+            frappe.clear_messages()
 
-    # Add updated counts to Diet Preferences child table
-    for preference, count in diet_count.items():
-        doc.append("diet_preferences", {
-            "dietary_preference": preference,
-            "total_people": count
-        })
+    return {"created": created, "errors": errors}
@@ -0,0 +1,27 @@
+frappe.listview_settings['Booking Inquiry'] = {
+    onload: function (listview) {
+        listview.page.add_actions_menu_item(__('Create Reservations'), function () {
+            let names = listview.get_checked_items(true);
+            if (!names.length) return;
+
+            frappe.call({
+                method: "tours_and_safaris.tours_and_safaris.doctype.booking_inquiry.booking_inquiry.make_reservations",
+                args: { booking_inquiries: names },
+                freeze: true,
+                freeze_message: __("Creating Reservations..."),
+                callback: function (r) {
+                    let created = Object.keys(r.message.created).length;
+                    let errors = Object.entries(r.message.errors)
+                        .map(([name, error]) => `${name}: ${error}`);
+
+                    frappe.msgprint({
+                        title: __("Create Reservations"),
+                        message: [__("{0} reservation(s) created.", [created]), ...errors].join("<br>"),
+                        indicator: errors.length ? "orange" : "green"
+                    });
+                    listview.refresh();
+                }
+            });
+        });
+    }
+};
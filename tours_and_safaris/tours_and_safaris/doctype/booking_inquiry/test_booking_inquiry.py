@@ -1,9 +1,21 @@
 # Copyright (c) 2025, wanguimbutu and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from tours_and_safaris.tours_and_safaris.doctype.booking_inquiry.booking_inquiry import summarize_guests
+
 
 class TestBookingInquiry(FrappeTestCase):
-	pass
+	def test_guest_summary_in_one_pass(self):
+		guests = [
+			frappe._dict(idx=1, age="Adult", dietary_preference="Vegan"),
+			frappe._dict(idx=2, age="Child", dietary_preference="Vegan"),
+			frappe._dict(idx=3, age="Adult", dietary_preference=None),
+			frappe._dict(idx=4, age="", dietary_preference="Halal"),
+		]
+
+		summary = summarize_guests(guests)
+		self.assertEqual((summary.adults, summary.children), (2, 1))
+		self.assertEqual(summary.diets, {"Vegan": 2, "Halal": 1})
@@ -0,0 +1,269 @@
+# Copyright (c) 2025, wanguimbutu and contributors
+# For license information, please see license.txt
+
+"""Normalised contact keys for finding existing Customers.
+
+Every Customer contributes its email, phone, full name and name tokens.
+Every Booking Inquiry or Reservation contributes its guests' emails and
+phones as separate Guest Email / Guest Phone keys of the booking's Customer:
+a guest on a group trip is not that Customer, so these only ever suggest a
+match. A lookup normalises the incoming details the same way and reads only
+the rows sharing one of those keys, so its cost depends on how common the
+keys are, not on the number of Customers.
+"""
+
+import re
+import unicodedata
+
+import frappe
+from frappe.model.document import Document
+
+from tours_and_safaris.utils import bulk_insert_docs
+
+CUSTOMER_MATCH_KEY_BULK_FIELDS = ("match_key", "key_type", "customer", "reference_doctype", "reference_name")
+
+# Score a candidate earns for each distinct key it shares with the lookup
+KEY_WEIGHTS = {
+	"Email": 100,
+	"Phone": 80,
+	"Name": 60,
+	"Guest Email": 40,
+	"Guest Phone": 30,
+	"Name Token": 10,
+}
+# Only the Customer's own contact keys identify it; everything else is a suggestion
+SAME_CUSTOMER_KEY_TYPES = ("Email", "Phone")
+
+NAME_STOPWORDS = {"mr", "mrs", "ms", "miss", "dr", "prof", "the", "and", "ltd", "limited"}
+# Trailing digits kept from a phone number, which drops country codes and trunk prefixes
+PHONE_DIGITS = 9
+# Name tokens shared by more index rows than this (e.g. "john") are too common to block on
+MAX_NAME_TOKEN_ROWS = 200
+
+
+class CustomerMatchKey(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Customer Match Key", ["reference_doctype", "reference_name"])
+
+
+def normalize_email(email):
+	email = (email or "").strip().lower()
+	if "@" not in email:
+		return None
+
+	local, _, domain = email.partition("@")
+	# Plus-addressing reaches the same mailbox
+	return f"{local.split('+', 1)[0]}@{domain}"
+
+
+def normalize_phone(phone):
+	digits = re.sub(r"\D", "", phone or "")
+	return digits[-PHONE_DIGITS:] if len(digits) >= 7 else None
+
+
+def get_name_tokens(name):
+	"""Lower-case, accent-free name tokens without titles, sorted."""
+	name = unicodedata.normalize("NFKD", name or "")
+	name = "".join(char for char in name if not unicodedata.combining(char)).lower()
+	tokens = {token for token in re.split(r"[^a-z0-9]+", name) if len(token) > 1}
+
+	return sorted(tokens - NAME_STOPWORDS)
+
+
+def get_match_keys(name=None, email=None, phone=None):
+	"""[(key_type, match_key)] for a set of contact details."""
+	keys = []
+	if email := normalize_email(email):
+		keys.append(("Email", f"email:{email}"))
+	if phone := normalize_phone(phone):
+		keys.append(("Phone", f"phone:{phone}"))
+
+	tokens = get_name_tokens(name)
+	if tokens:
+		keys.append(("Name", "name:" + " ".join(tokens)))
+		# Blocking keys so "Jane W. Doe" and "Doe Jane" still meet
+		keys += [("Name Token", f"token:{token}") for token in tokens if len(token) > 2]
+
+	return keys
+
+
+def replace_keys(reference_doctype, reference_name, rows):
+	"""Swap the index rows contributed by one document."""
+	frappe.db.delete("Customer Match Key", {
+		"reference_doctype": reference_doctype,
+		"reference_name": reference_name,
+	})
+
+	unique = {(row["customer"], row["match_key"]): row for row in rows}
+	bulk_insert_docs("Customer Match Key", CUSTOMER_MATCH_KEY_BULK_FIELDS, [
+		{**row, "reference_doctype": reference_doctype, "reference_name": reference_name}
+		for row in unique.values()
+	])
+
+
+def index_customer(doc, method=None):
+	"""Customer on_update: index its name, email and phone."""
+	replace_keys("Customer", doc.name, [
+		{"customer": doc.name, "key_type": key_type, "match_key": match_key}
+		for key_type, match_key in get_match_keys(
+			doc.customer_name, doc.get("email_id"), doc.get("mobile_no")
+		)
+	])
+
+
+def index_guest_contacts(doc, method=None):
+	"""Booking Inquiry / Reservation on_update: index guest emails and phones as Guest keys of the booking's Customer."""
+	rows = []
+	if doc.get("customer_name"):
+		for guest in doc.get("guest_details") or []:
+			rows += [
+				{"customer": doc.customer_name, "key_type": f"Guest {key_type}", "match_key": match_key}
+				for key_type, match_key in get_match_keys(email=guest.email_address, phone=guest.phone_number)
+			]
+
+	replace_keys(doc.doctype, doc.name, rows)
+
+
+def drop_keys(doc, method=None):
+	"""on_trash: remove what the document put in the index, and a deleted Customer's keys from bookings."""
+	frappe.db.delete("Customer Match Key", {"reference_doctype": doc.doctype, "reference_name": doc.name})
+	if doc.doctype == "Customer":
+		frappe.db.delete("Customer Match Key", {"customer": doc.name})
+
+
+def find_matches(name=None, email=None, phone=None, limit=5):
+	"""Customers sharing normalised keys with the details, best first: [{customer, score, matched_on}]."""
+	keys = dict((match_key, key_type) for key_type, match_key in get_match_keys(name, email, phone))
+	keys = drop_common_name_tokens(keys)
+	if not keys:
+		return []
+
+	rows = frappe.db.sql("""
+		SELECT DISTINCT customer, key_type, match_key
+		FROM `tabCustomer Match Key`
+		WHERE match_key IN %(keys)s
+	""", {"keys": list(keys)}, as_dict=True)
+
+	matches = score_candidates(rows)[:int(limit)]
+
+	names = dict(frappe.get_all(
+		"Customer",
+		filters={"name": ["in", [match["customer"] for match in matches]]},
+		fields=["name", "customer_name"],
+		as_list=True,
+	)) if matches else {}
+	for match in matches:
+		match["customer_name"] = names.get(match["customer"])
+
+	# Index rows of Customers deleted outside the hooks are skipped
+	return [match for match in matches if match["customer"] in names]
+
+
+def drop_common_name_tokens(keys):
+	"""{match_key: key_type} without the name tokens so common that reading their rows would scan the index."""
+	tokens = [match_key for match_key, key_type in keys.items() if key_type == "Name Token"]
+	if not tokens:
+		return keys
+
+	common = set(frappe.db.sql("""
+		SELECT match_key
+		FROM `tabCustomer Match Key`
+		WHERE match_key IN %(tokens)s
+		GROUP BY match_key
+		HAVING COUNT(*) > %(max_rows)s
+	""", {"tokens": tokens, "max_rows": MAX_NAME_TOKEN_ROWS}, pluck=True))
+
+	return {match_key: key_type for match_key, key_type in keys.items() if match_key not in common}
+
+
+def score_candidates(rows):
+	"""Candidates from matching index rows, best first; a lone shared name token is not a match."""
+	candidates = {}
+	for row in rows:
+		candidate = candidates.setdefault(row["customer"], {"customer": row["customer"], "score": 0, "matched_on": []})
+		candidate["score"] += KEY_WEIGHTS[row["key_type"]]
+		if row["key_type"] not in candidate["matched_on"]:
+			candidate["matched_on"].append(row["key_type"])
+
+	matches = sorted(candidates.values(), key=lambda candidate: (-candidate["score"], candidate["customer"]))
+	return [match for match in matches if match["score"] > KEY_WEIGHTS["Name Token"]]
+
+
+def is_same_customer(match):
+	"""True when a match shares the Customer's own email or phone; name and guest matches are only suggestions."""
+	return any(key_type in SAME_CUSTOMER_KEY_TYPES for key_type in match["matched_on"])
+
+
+@frappe.whitelist()
+def get_customer_matches(name=None, email=None, phone=None, limit=5):
+	"""Likely existing Customers for a name, email and/or phone."""
+	frappe.has_permission("Customer", throw=True)
+	return find_matches(name, email, phone, limit)
+
+
+@frappe.whitelist()
+def rebuild_customer_match_index(page_length=5000):
+	"""Re-index every Customer and every booking's guests, e.g. after installing or importing data."""
+	frappe.only_for("System Manager")
+	frappe.db.delete("Customer Match Key")
+
+	def pages(doctype, fields):
+		last_name = ""
+		while True:
+			page = frappe.get_all(
+				doctype,
+				filters={"name": [">", last_name]},
+				fields=fields,
+				order_by="name asc",
+				limit=page_length,
+			)
+			if not page:
+				return
+			yield page
+			last_name = page[-1].name
+
+	total = 0
+	for customers in pages("Customer", ["name", "customer_name", "email_id", "mobile_no"]):
+		rows = [
+			{
+				"customer": customer.name,
+				"key_type": key_type,
+				"match_key": match_key,
+				"reference_doctype": "Customer",
+				"reference_name": customer.name,
+			}
+			for customer in customers
+			for key_type, match_key in get_match_keys(customer.customer_name, customer.email_id, customer.mobile_no)
+		]
+		bulk_insert_docs("Customer Match Key", CUSTOMER_MATCH_KEY_BULK_FIELDS, rows)
+		total += len(rows)
+
+	for doctype in ("Booking Inquiry", "Reservation"):
+		for bookings in pages(doctype, ["name", "customer_name"]):
+			customers = {booking.name: booking.customer_name for booking in bookings if booking.customer_name}
+			if not customers:
+				continue
+
+			rows = {}
+			for guest in frappe.get_all(
+				"Guest Details",
+				filters={"parenttype": doctype, "parentfield": "guest_details", "parent": ["in", list(customers)]},
+				fields=["parent", "email_address", "phone_number"],
+			):
+				for key_type, match_key in get_match_keys(email=guest.email_address, phone=guest.phone_number):
+					rows[(guest.parent, match_key)] = {
+						"customer": customers[guest.parent],
+						"key_type": f"Guest {key_type}",
+						"match_key": match_key,
+						"reference_doctype": doctype,
+						"reference_name": guest.parent,
+					}
+			bulk_insert_docs("Customer Match Key", CUSTOMER_MATCH_KEY_BULK_FIELDS, list(rows.values()))
+			total += len(rows)
+
+	frappe.db.commit()
+
+	return total
@@ -0,0 +1,71 @@
+# Copyright (c) 2025, wanguimbutu and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from tours_and_safaris.tours_and_safaris.doctype.customer_match_key.customer_match_key import (
+	CUSTOMER_MATCH_KEY_BULK_FIELDS,
+	drop_common_name_tokens,
+	get_match_keys,
+	is_same_customer,
+	score_candidates,
+)
+from tours_and_safaris.utils import bulk_insert_docs
+
+
+def index_rows(customer, keys):
+	return [{"customer": customer, "key_type": key_type, "match_key": match_key} for key_type, match_key in keys]
+
+
+class TestCustomerMatchKey(FrappeTestCase):
+	def test_equivalent_contacts_share_keys(self):
+		first = get_match_keys("Mr. José  Kamau", "Jose.Kamau+trips@Example.com", "+254 712 345 678")
+		second = get_match_keys("kamau jose", "jose.kamau@example.com", "0712345678")
+
+		self.assertEqual(first, second)
+		self.assertIn(("Name Token", "token:kamau"), first)
+
+	def test_unusable_details_give_no_keys(self):
+		self.assertEqual(get_match_keys("Mr", "not-an-email", "123"), [])
+
+	def test_name_only_match_is_not_the_same_customer(self):
+		# Every name key of "John Smith" matches, which used to reach the auto-link score
+		[match] = score_candidates(index_rows("CUST-JS", get_match_keys("John Smith")))
+
+		self.assertEqual(match["score"], 80)
+		self.assertFalse(is_same_customer(match))
+
+	def test_guest_contact_match_is_not_the_same_customer(self):
+		rows = [
+			{"customer": "ACME Ltd", "key_type": "Guest Email", "match_key": "email:jane@example.com"},
+			{"customer": "ACME Ltd", "key_type": "Guest Phone", "match_key": "phone:712345678"},
+		]
+		[match] = score_candidates(rows)
+
+		self.assertFalse(is_same_customer(match))
+
+	def test_own_email_match_is_the_same_customer(self):
+		[match] = score_candidates(index_rows("CUST-JD", get_match_keys(email="jane@example.com")))
+		self.assertTrue(is_same_customer(match))
+
+	def test_common_name_tokens_are_not_read(self):
+		bulk_insert_docs("Customer Match Key", CUSTOMER_MATCH_KEY_BULK_FIELDS, [
+			{
+				"customer": customer,
+				"key_type": "Name Token",
+				"match_key": "token:_testcommon",
+				"reference_doctype": "Customer",
+				"reference_name": customer,
+			}
+			for customer in ("_Test CMK 1", "_Test CMK 2", "_Test CMK 3")
+		])
+		keys = {"token:_testcommon": "Name Token", "token:_testrare": "Name Token", "email:a@example.com": "Email"}
+
+		module = "tours_and_safaris.tours_and_safaris.doctype.customer_match_key.customer_match_key"
+		with patch(f"{module}.MAX_NAME_TOKEN_ROWS", 2):
+			self.assertEqual(
+				drop_common_name_tokens(keys),
+				{"token:_testrare": "Name Token", "email:a@example.com": "Email"},
+			)
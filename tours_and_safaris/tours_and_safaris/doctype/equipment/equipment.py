@@ -1,9 +1,136 @@
 # Copyright (c) 2025, wanguimbutu and contributors
 # For license information, please see license.txt
 
-# import frappe
+import json
+import time
+
+import frappe
 from frappe.model.document import Document
+from frappe.utils import add_days, add_months, date_diff, getdate, today
+
+# Months between inspections per frequency
+FREQUENCY_MONTHS = {"Monthly": 1, "Yearly": 12}
+# Notice period for items without a notify date
+DEFAULT_NOTICE_DAYS = 7
 
 
 class Equipment(Document):
 	pass
+
+
+def get_next_dates(item, run_date):
+	"""(next_check_date, notify_date) for the first inspection after `run_date`, keeping the notice period."""
+	months = FREQUENCY_MONTHS.get(item.frequency)
+	if not months:
+		return None
+
+	next_check_date = getdate(item.next_check_date)
+
+	notice_days = DEFAULT_NOTICE_DAYS
+	if item.notify_date:
+		notice_days = max(date_diff(next_check_date, getdate(item.notify_date)), 0)
+
+	# An item that missed several runs skips straight to its next future date
+	periods = 1
+	while add_months(next_check_date, months * periods) <= run_date:
+		periods += 1
+	next_check_date = add_months(next_check_date, months * periods)
+
+	return next_check_date, add_days(next_check_date, -notice_days)
+
+
+def get_due_equipment(run_date, last_run_date=None):
+	"""Equipment needing attention on `run_date`, from the next_check_date and notify_date indexes.
+
+	Items whose check date has been reached are due. Items whose notify date
+	fell after the previous run are given notice of an upcoming check.
+	"""
+	fields = ["name", "frequency", "next_check_date", "notify_date"]
+	due = frappe.get_all("Equipment", filters={"next_check_date": ["<=", run_date]}, fields=fields)
+
+	notice_filters = [["notify_date", "<=", run_date], ["next_check_date", ">", run_date]]
+	if last_run_date:
+		notice_filters.append(["notify_date", ">", last_run_date])
+	notice = frappe.get_all("Equipment", filters=notice_filters, fields=fields)
+
+	return due, notice
+
+
+def get_inspection_recipients():
+	"""Users to notify: `equipment_inspection_recipients` in site config, else enabled System Managers."""
+	recipients = frappe.conf.get("equipment_inspection_recipients")
+	if recipients:
+		return list(recipients)
+
+	users = frappe.get_all(
+		"Has Role",
+		filters={"role": "System Manager", "parenttype": "User", "parent": ["not in", ["Administrator", "Guest"]]},
+		pluck="parent",
+		distinct=True,
+	)
+	return frappe.get_all("User", filters={"name": ["in", users], "enabled": 1}, pluck="email") if users else []
+
+
+def send_inspection_digest(recipients, due, notice, run_date):
+	"""One email covering every item due or coming up for inspection."""
+	lines = [f"<p>Equipment inspections as of {run_date}:</p>"]
+	if due:
+		lines.append("<p><b>Due now</b></p><ul>")
+		lines += [f"<li>{item.name} (was due {item.next_check_date})</li>" for item in due]
+		lines.append("</ul>")
+	if notice:
+		lines.append("<p><b>Coming up</b></p><ul>")
+		lines += [f"<li>{item.name} on {item.next_check_date}</li>" for item in notice]
+		lines.append("</ul>")
+
+	frappe.sendmail(
+		recipients=recipients,
+		subject=f"Equipment inspections: {len(due)} due, {len(notice)} coming up",
+		message="".join(lines),
+		delayed=True,
+	)
+
+
+def run_inspection_schedule():
+	"""Daily job: notify about due and upcoming inspections, move due items to their next dates, log the run."""
+	started = time.perf_counter()
+	run_date = getdate(today())
+	last_run_date = frappe.db.sql("SELECT MAX(run_date) FROM `tabEquipment Inspection Run`")[0][0]
+	if last_run_date and getdate(last_run_date) >= run_date:
+		return
+
+	due, notice = get_due_equipment(run_date, last_run_date)
+
+	recipients = get_inspection_recipients() if due or notice else []
+	if recipients:
+		send_inspection_digest(recipients, due, notice, run_date)
+
+	updates = {}
+	for item in due:
+		next_dates = get_next_dates(item, run_date)
+		if next_dates:
+			updates[item.name] = {"next_check_date": next_dates[0], "notify_date": next_dates[1]}
+	if updates:
+		frappe.db.bulk_update("Equipment", updates)
+
+	summary = {
+		"run_date": run_date,
+		"due": len(due),
+		"notified": len(notice),
+		"rescheduled": len(updates),
+		"recipients": len(recipients),
+		"seconds": round(time.perf_counter() - started, 3),
+	}
+	frappe.get_doc({
+		"doctype": "Equipment Inspection Run",
+		**summary,
+		"items": json.dumps({
+			"due": [item.name for item in due],
+			"notice": [item.name for item in notice],
+			# Due items left in place because they have no frequency
+			"unscheduled": [item.name for item in due if item.name not in updates],
+		}, indent=1),
+	}).insert(ignore_permissions=True)
+	frappe.logger("tours_and_safaris").info({"job": "equipment_inspections", **summary})
+
+	return summary
@@ -1,9 +1,21 @@
 # Copyright (c) 2025, wanguimbutu and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
+from frappe.utils import getdate
+
+from tours_and_safaris.tours_and_safaris.doctype.equipment.equipment import get_next_dates
 
 
 class TestEquipment(FrappeTestCase):
-	pass
+	def test_next_dates_skip_missed_periods_and_keep_notice(self):
+		item = frappe._dict(frequency="Monthly", next_check_date="2025-01-15", notify_date="2025-01-05")
+
+		next_check_date, notify_date = get_next_dates(item, getdate("2025-03-20"))
+		self.assertEqual(next_check_date, getdate("2025-04-15"))
+		self.assertEqual(notify_date, getdate("2025-04-05"))
+
+	def test_next_dates_need_a_frequency(self):
+		item = frappe._dict(frequency=None, next_check_date="2025-01-15", notify_date=None)
+		self.assertIsNone(get_next_dates(item, getdate("2025-01-15")))
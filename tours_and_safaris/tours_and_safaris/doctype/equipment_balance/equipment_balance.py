@@ -0,0 +1,267 @@
+# Copyright (c) 2025, wanguimbutu and contributors
+# For license information, please see license.txt
+
+"""Daily equipment movement ledger built from submitted Equipment Logs.
+
+There is one Equipment Balance row per item and date holding the units issued,
+returned and found damaged that day. Units out on a date are the running sum
+of ``issued - returned + damaged`` up to it, so damaged units never count as
+back in stock. Rows are updated in place when an Equipment Log is submitted
+or cancelled, and availability for a window reads only that item's rows.
+"""
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import cint, getdate, now_datetime
+
+from tours_and_safaris.utils import bulk_insert_docs
+
+EQUIPMENT_BALANCE_BULK_FIELDS = ("equipment", "posting_date", "issued", "returned", "damaged")
+
+
+class EquipmentBalance(Document):
+	pass
+
+
+class EquipmentStockError(frappe.ValidationError):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_unique("Equipment Balance", ["equipment", "posting_date"])
+
+
+def get_log_movements(log):
+	"""Ledger rows for one Equipment Log: the issue on its issue date, the return on its return date."""
+	if not log.equipment_name:
+		return []
+
+	movements = []
+	if log.date_issued and cint(log.quantity_issued):
+		movements.append(frappe._dict(
+			equipment=log.equipment_name,
+			posting_date=getdate(log.date_issued),
+			issued=cint(log.quantity_issued),
+			returned=0,
+			damaged=0,
+		))
+	if log.date_returned and (cint(log.quantity_returned) or cint(log.number_of_damaged)):
+		movements.append(frappe._dict(
+			equipment=log.equipment_name,
+			posting_date=getdate(log.date_returned),
+			issued=0,
+			returned=cint(log.quantity_returned),
+			damaged=cint(log.number_of_damaged),
+		))
+
+	return movements
+
+
+def post_movements(movements, sign=1):
+	"""Add (sign=1) or reverse (sign=-1) movements on their item-date rows."""
+	now, user = now_datetime(), frappe.session.user
+	for movement in movements:
+		frappe.db.sql("""
+			INSERT INTO `tabEquipment Balance`
+				(name, creation, modified, owner, modified_by, docstatus,
+				equipment, posting_date, issued, returned, damaged)
+			VALUES
+				(%(name)s, %(now)s, %(now)s, %(user)s, %(user)s, 0,
+				%(equipment)s, %(posting_date)s, %(issued)s, %(returned)s, %(damaged)s)
+			ON DUPLICATE KEY UPDATE
+				issued = issued + VALUES(issued),
+				returned = returned + VALUES(returned),
+				damaged = damaged + VALUES(damaged),
+				modified = VALUES(modified)
+		""", {
+			**movement,
+			"issued": sign * movement.issued,
+			"returned": sign * movement.returned,
+			"damaged": sign * movement.damaged,
+			"name": frappe.generate_hash(length=10),
+			"now": now,
+			"user": user,
+		})
+
+	if sign < 0 and movements:
+		frappe.db.sql("""
+			DELETE FROM `tabEquipment Balance`
+			WHERE equipment IN %(equipment)s
+				AND issued = 0 AND returned = 0 AND damaged = 0
+		""", {"equipment": list({movement.equipment for movement in movements})})
+
+
+def get_peak_outstanding(equipment_names, from_date, to_date=None):
+	"""Return {equipment: most units out on any day from `from_date` to `to_date`}.
+
+	Without `to_date` the window is open-ended. One grouped query gives the
+	balance before the window and a second walks the item-date rows inside it.
+	"""
+	equipment_names = list(equipment_names)
+	if not equipment_names:
+		return {}
+
+	params = {
+		"equipment": equipment_names,
+		"from_date": getdate(from_date),
+		"to_date": getdate(to_date) if to_date else None,
+	}
+	running = {
+		equipment: cint(out)
+		for equipment, out in frappe.db.sql("""
+			SELECT equipment, SUM(issued - returned + damaged)
+			FROM `tabEquipment Balance`
+			WHERE equipment IN %(equipment)s
+				AND posting_date < %(from_date)s
+			GROUP BY equipment
+		""", params)
+	}
+	peak = dict(running)
+
+	window = "AND posting_date <= %(to_date)s" if to_date else ""
+	for row in frappe.db.sql(f"""
+		SELECT equipment, issued - returned + damaged AS net
+		FROM `tabEquipment Balance`
+		WHERE equipment IN %(equipment)s
+			AND posting_date >= %(from_date)s
+			{window}
+		ORDER BY equipment, posting_date
+	""", params, as_dict=True):
+		running[row.equipment] = running.get(row.equipment, 0) + cint(row.net)
+		peak[row.equipment] = max(peak.get(row.equipment, 0), running[row.equipment])
+
+	return {equipment: max(peak.get(equipment, 0), 0) for equipment in equipment_names}
+
+
+def get_free_equipment(equipment_names, from_date, to_date=None, for_update=False):
+	"""Return {equipment: units free for the whole window}; items without a quantity map to None."""
+	equipment_names = list(equipment_names)
+	if not equipment_names:
+		return {}
+
+	if for_update:
+		# Serialise concurrent submits issuing the same items
+		quantities = dict(frappe.db.sql("""
+			SELECT name, quantity FROM `tabEquipment`
+			WHERE name IN %(names)s
+			ORDER BY name
+			FOR UPDATE
+		""", {"names": equipment_names}))
+	else:
+		quantities = dict(frappe.get_all(
+			"Equipment",
+			filters={"name": ["in", equipment_names]},
+			fields=["name", "quantity"],
+			as_list=True,
+		))
+
+	peak = get_peak_outstanding(quantities, from_date, to_date)
+
+	return {
+		equipment: cint(quantity) - peak[equipment] if cint(quantity) else None
+		for equipment, quantity in quantities.items()
+	}
+
+
+def ensure_equipment_available(log):
+	"""Throw EquipmentStockError if an Equipment Log issues more units than are free until its return date."""
+	if not log.equipment_name or not log.date_issued or not cint(log.quantity_issued):
+		return
+
+	free = get_free_equipment([log.equipment_name], log.date_issued, log.date_returned, for_update=True)
+	left = free.get(log.equipment_name)
+	if left is not None and cint(log.quantity_issued) > left:
+		frappe.throw(
+			f"Only {max(left, 0)} of {log.equipment_name} free from {log.date_issued}, "
+			f"{cint(log.quantity_issued)} requested",
+			EquipmentStockError,
+			title="Not enough equipment",
+		)
+
+
+@frappe.whitelist()
+def get_equipment_availability(from_date, to_date=None, equipment=None):
+	"""Units out and free per item for a window (free is None where the quantity is not set)."""
+	filters = {"name": equipment} if equipment else {}
+	quantities = dict(frappe.get_all("Equipment", filters=filters, fields=["name", "quantity"], as_list=True))
+	peak = get_peak_outstanding(quantities, from_date, to_date)
+
+	return [
+		{
+			"equipment": name,
+			"quantity": cint(quantities[name]),
+			"out": peak[name],
+			"free": cint(quantities[name]) - peak[name] if cint(quantities[name]) else None,
+		}
+		for name in sorted(quantities)
+	]
+
+
+@frappe.whitelist()
+def check_reservation_kit(reservation_name, items=None):
+	"""Check a reservation's kit list against stock for its stay.
+
+	`items` is {equipment: qty}; by default the kit list is the reservation's
+	draft Equipment Logs.
+	"""
+	reservation = frappe.db.get_value(
+		"Reservation", reservation_name, ["arrival_date", "depature_date"], as_dict=True
+	)
+	if not reservation or not reservation.arrival_date:
+		frappe.throw(f"Reservation {reservation_name} has no arrival date.")
+
+	if items:
+		requested = {equipment: cint(qty) for equipment, qty in frappe.parse_json(items).items()}
+	else:
+		requested = {}
+		for row in frappe.get_all(
+			"Equipment Log",
+			filters={"reservation_name": reservation_name, "docstatus": 0},
+			fields=["equipment_name", "quantity_issued"],
+		):
+			if row.equipment_name:
+				requested[row.equipment_name] = requested.get(row.equipment_name, 0) + cint(row.quantity_issued)
+
+	free = get_free_equipment(
+		requested, reservation.arrival_date, reservation.depature_date or reservation.arrival_date
+	)
+	kit = []
+	for equipment, qty in sorted(requested.items()):
+		left = free.get(equipment)
+		kit.append({
+			"equipment": equipment,
+			"requested": qty,
+			"free": left,
+			"short": 0 if left is None else max(qty - max(left, 0), 0),
+		})
+
+	return {"available": not any(item["short"] for item in kit), "items": kit}
+
+
+@frappe.whitelist()
+def rebuild_equipment_balances():
+	"""Recreate the ledger from every submitted Equipment Log, e.g. after importing logs."""
+	frappe.only_for("System Manager")
+
+	totals = {}
+	for log in frappe.get_all(
+		"Equipment Log",
+		filters={"docstatus": 1},
+		fields=[
+			"equipment_name", "date_issued", "quantity_issued",
+			"date_returned", "quantity_returned", "number_of_damaged",
+		],
+	):
+		for movement in get_log_movements(log):
+			key = (movement.equipment, movement.posting_date)
+			total = totals.setdefault(key, frappe._dict(
+				equipment=movement.equipment, posting_date=movement.posting_date, issued=0, returned=0, damaged=0
+			))
+			total.issued += movement.issued
+			total.returned += movement.returned
+			total.damaged += movement.damaged
+
+	frappe.db.delete("Equipment Balance")
+	bulk_insert_docs("Equipment Balance", EQUIPMENT_BALANCE_BULK_FIELDS, list(totals.values()))
+
+	return len(totals)
@@ -0,0 +1,31 @@
+# Copyright (c) 2025, wanguimbutu and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from tours_and_safaris.tours_and_safaris.doctype.equipment_balance.equipment_balance import (
+	get_log_movements,
+)
+
+
+class TestEquipmentBalance(FrappeTestCase):
+	def test_log_movements_split_issue_and_return(self):
+		log = frappe._dict(
+			equipment_name="Kayak",
+			date_issued="2025-03-01",
+			quantity_issued=4,
+			date_returned="2025-03-05",
+			quantity_returned=4,
+			number_of_damaged=1,
+		)
+
+		issue, back = get_log_movements(log)
+		self.assertEqual((issue.issued, issue.returned, issue.damaged), (4, 0, 0))
+		self.assertEqual((back.issued, back.returned, back.damaged), (0, 4, 1))
+		# One damaged unit stays out after the return
+		self.assertEqual(sum(m.issued - m.returned + m.damaged for m in (issue, back)), 1)
+
+	def test_log_without_return_only_issues(self):
+		log = frappe._dict(equipment_name="Kayak", date_issued="2025-03-01", quantity_issued=2)
+		self.assertEqual(len(get_log_movements(log)), 1)
@@ -4,6 +4,19 @@
 # import frappe
 from frappe.model.document import Document
 
+from tours_and_safaris.tours_and_safaris.doctype.equipment_balance.equipment_balance import (
+	ensure_equipment_available,
+	get_log_movements,
+	post_movements,
+)
+
 
 class EquipmentLog(Document):
-	pass
+	def before_submit(self):
+		ensure_equipment_available(self)
+
+	def on_submit(self):
+		post_movements(get_log_movements(self))
+
+	def on_cancel(self):
+		post_movements(get_log_movements(self), sign=-1)
@@ -0,0 +1,297 @@
+# Copyright (c) 2025, wanguimbutu and contributors
+# For license information, please see license.txt
+
+"""Returning-guest directory built from the Guest Details of inquiries and reservations.
+
+Guests are deduplicated by normalised email, else phone, else name within the
+booking's Customer; that key is the Guest Directory name. Each booking a
+guest appears in is a Guest Stay row. Both tables are rewritten for one
+booking at a time when it is saved, so lookups never touch the child tables.
+
+Only Reservations count as stays. An inquiry's rows are kept so prospective
+guests can be found, and drop out of a guest's history once the inquiry has
+been converted into a Reservation.
+"""
+
+import re
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import cint, now_datetime
+
+from tours_and_safaris.tours_and_safaris.doctype.customer_match_key.customer_match_key import (
+	get_name_tokens,
+	normalize_email,
+	normalize_phone,
+)
+from tours_and_safaris.utils import bulk_insert_docs
+
+GUEST_STAY_BULK_FIELDS = (
+	"guest", "guest_name", "customer", "dietary_preference",
+	"reference_doctype", "reference_name", "booking_inquiry", "arrival_date", "depature_date",
+)
+
+# Booking doctype -> (arrival field, departure field)
+BOOKING_DATES = {
+	"Booking Inquiry": ("from_date", "to_date"),
+	"Reservation": ("arrival_date", "depature_date"),
+}
+
+
+class GuestDirectory(Document):
+	pass
+
+
+def on_doctype_update():
+	if not frappe.db.has_index("tabGuest Directory", "search_text_fulltext"):
+		frappe.db.sql_ddl(
+			"ALTER TABLE `tabGuest Directory` ADD FULLTEXT INDEX search_text_fulltext (search_text)"
+		)
+
+
+def get_guest_key(guest, scope):
+	"""Normalised identity of a guest row; guests without contact details are only merged within `scope`."""
+	if email := normalize_email(guest.email_address):
+		return f"email:{email}"
+	if phone := normalize_phone(guest.phone_number):
+		return f"phone:{phone}"
+	if tokens := get_name_tokens(guest.guest_name):
+		return f"name:{' '.join(tokens)}@{scope}"
+
+
+def get_search_text(guest):
+	"""Words the full-text index matches on: name tokens, email parts, phone digits and country."""
+	words = get_name_tokens(guest.guest_name)
+	if email := normalize_email(guest.email_address):
+		words += re.split(r"[@.+_-]+", email)
+	if phone := normalize_phone(guest.phone_number):
+		words.append(phone)
+	if guest.country_of_residence:
+		words.append(guest.country_of_residence.lower())
+
+	return " ".join(word for word in words if word)
+
+
+def index_booking_guests(doc, method=None):
+	"""Booking Inquiry / Reservation on_update and on_update_after_submit: rewrite this booking's guests."""
+	arrival_field, departure_field = BOOKING_DATES[doc.doctype]
+	scope = doc.get("customer_name") or doc.name
+
+	guests = {}
+	for guest in doc.get("guest_details") or []:
+		guest_key = get_guest_key(guest, scope)
+		if guest_key:
+			guests[guest_key] = guest
+
+	touched = set(remove_booking_stays(doc.doctype, doc.name))
+	if guests:
+		upsert_guests(guests)
+		bulk_insert_docs("Guest Stay", GUEST_STAY_BULK_FIELDS, [
+			{
+				"guest": guest_key,
+				"guest_name": guest.guest_name,
+				"customer": doc.get("customer_name"),
+				"dietary_preference": guest.dietary_preference,
+				"reference_doctype": doc.doctype,
+				"reference_name": doc.name,
+				"booking_inquiry": doc.name if doc.doctype == "Booking Inquiry" else doc.get("booking_inquiry"),
+				"arrival_date": doc.get(arrival_field),
+				"depature_date": doc.get(departure_field),
+			}
+			for guest_key, guest in guests.items()
+		])
+
+	refresh_stay_counts(touched | set(guests))
+
+
+def remove_booking_guests(doc, method=None):
+	"""on_cancel / on_trash: take the booking out of its guests' histories."""
+	refresh_stay_counts(remove_booking_stays(doc.doctype, doc.name))
+
+
+def remove_booking_stays(reference_doctype, reference_name):
+	"""Delete a booking's Guest Stay rows and return the guests they belonged to."""
+	filters = {"reference_doctype": reference_doctype, "reference_name": reference_name}
+	guests = frappe.get_all("Guest Stay", filters=filters, pluck="guest")
+	if guests:
+		frappe.db.delete("Guest Stay", filters)
+
+	return guests
+
+
+def upsert_guests(guests):
+	"""Insert or refresh directory rows from {guest_key: guest row}; the latest booking's details win."""
+	now, user = now_datetime(), frappe.session.user
+	for guest_key, guest in guests.items():
+		frappe.db.sql("""
+			INSERT INTO `tabGuest Directory`
+				(name, creation, modified, owner, modified_by, docstatus,
+				guest_name, email_address, phone_number, phone_key,
+				country_of_residence, dietary_preference, search_text)
+			VALUES
+				(%(name)s, %(now)s, %(now)s, %(user)s, %(user)s, 0,
+				%(guest_name)s, %(email_address)s, %(phone_number)s, %(phone_key)s,
+				%(country_of_residence)s, %(dietary_preference)s, %(search_text)s)
+			ON DUPLICATE KEY UPDATE
+				guest_name = COALESCE(VALUES(guest_name), guest_name),
+				email_address = COALESCE(VALUES(email_address), email_address),
+				phone_number = COALESCE(VALUES(phone_number), phone_number),
+				phone_key = COALESCE(VALUES(phone_key), phone_key),
+				country_of_residence = COALESCE(VALUES(country_of_residence), country_of_residence),
+				dietary_preference = COALESCE(VALUES(dietary_preference), dietary_preference),
+				search_text = VALUES(search_text),
+				modified = VALUES(modified)
+		""", {
+			"name": guest_key,
+			"now": now,
+			"user": user,
+			"guest_name": guest.guest_name or None,
+			"email_address": normalize_email(guest.email_address),
+			"phone_number": guest.phone_number or None,
+			"phone_key": normalize_phone(guest.phone_number),
+			"country_of_residence": guest.country_of_residence or None,
+			"dietary_preference": guest.dietary_preference or None,
+			"search_text": get_search_text(guest),
+		})
+
+
+def refresh_stay_counts(guest_keys):
+	"""Recount Reservation stays and last arrival for the given guests with one UPDATE."""
+	guest_keys = list(set(guest_keys))
+	if not guest_keys:
+		return
+
+	frappe.db.sql("""
+		UPDATE `tabGuest Directory` directory
+		LEFT JOIN (
+			SELECT guest, COUNT(*) AS stays, MAX(arrival_date) AS last_arrival_date
+			FROM `tabGuest Stay`
+			WHERE guest IN %(guests)s
+				AND reference_doctype = 'Reservation'
+			GROUP BY guest
+		) stay ON stay.guest = directory.name
+		SET directory.stays = COALESCE(stay.stays, 0),
+			directory.last_arrival_date = stay.last_arrival_date
+		WHERE directory.name IN %(guests)s
+	""", {"guests": guest_keys})
+
+
+@frappe.whitelist()
+def search_guests(query, limit=20):
+	"""Find guests by email, phone, or name/country words; words match as prefixes."""
+	frappe.has_permission("Guest Directory", throw=True)
+	query, limit = (query or "").strip(), cint(limit) or 20
+	fields = "name, guest_name, email_address, phone_number, country_of_residence, dietary_preference, stays, last_arrival_date"
+
+	if "@" in query:
+		# Addresses starting with what was typed, so a full address is an exact match
+		return frappe.db.sql(f"""
+			SELECT {fields} FROM `tabGuest Directory`
+			WHERE email_address LIKE %(prefix)s
+			ORDER BY last_arrival_date DESC
+			LIMIT %(limit)s
+		""", {"prefix": query.lower().replace("%", "") + "%", "limit": limit}, as_dict=True)
+
+	if phone := normalize_phone(query):
+		return frappe.db.sql(f"""
+			SELECT {fields} FROM `tabGuest Directory`
+			WHERE phone_key = %(phone)s
+			ORDER BY last_arrival_date DESC
+			LIMIT %(limit)s
+		""", {"phone": phone, "limit": limit}, as_dict=True)
+
+	words = [word for word in re.split(r"\W+", query.lower()) if word]
+	if not words:
+		return []
+
+	if all(len(word) < 3 for word in words):
+		# Below the full-text minimum word length: name prefix on the indexed column
+		return frappe.db.sql(f"""
+			SELECT {fields} FROM `tabGuest Directory`
+			WHERE guest_name LIKE %(prefix)s
+			ORDER BY stays DESC, last_arrival_date DESC
+			LIMIT %(limit)s
+		""", {"prefix": query.replace("%", "") + "%", "limit": limit}, as_dict=True)
+
+	return frappe.db.sql(f"""
+		SELECT {fields} FROM `tabGuest Directory`
+		WHERE MATCH(search_text) AGAINST (%(words)s IN BOOLEAN MODE)
+		ORDER BY stays DESC, last_arrival_date DESC
+		LIMIT %(limit)s
+	""", {"words": " ".join(f"+{word}*" for word in words if len(word) > 2), "limit": limit}, as_dict=True)
+
+
+@frappe.whitelist()
+def get_guest_history(guest):
+	"""A guest's directory entry with every booking, stay dates and diet, from one joined query."""
+	frappe.has_permission("Guest Directory", throw=True)
+	rows = frappe.db.sql("""
+		SELECT
+			directory.name AS guest, directory.guest_name, directory.email_address,
+			directory.phone_number, directory.country_of_residence, directory.stays,
+			stay.reference_doctype, stay.reference_name, stay.booking_inquiry, stay.customer,
+			stay.arrival_date, stay.depature_date, stay.dietary_preference
+		FROM `tabGuest Directory` directory
+		LEFT JOIN `tabGuest Stay` stay ON stay.guest = directory.name
+		WHERE directory.name = %(guest)s
+		ORDER BY stay.arrival_date DESC
+	""", {"guest": guest}, as_dict=True)
+	if not rows:
+		frappe.throw(f"Guest {guest} not found.", frappe.DoesNotExistError)
+
+	first = rows[0]
+	stays = get_history_stays(rows)
+
+	return {
+		"guest": first.guest,
+		"guest_name": first.guest_name,
+		"email_address": first.email_address,
+		"phone_number": first.phone_number,
+		"country_of_residence": first.country_of_residence,
+		"diets": sorted({stay.dietary_preference for stay in stays if stay.dietary_preference}),
+		"reservations": [stay.reference_name for stay in stays if stay.reference_doctype == "Reservation"],
+		"stays": stays,
+	}
+
+
+def get_history_stays(rows):
+	"""A guest's bookings without inquiries that already became one of the listed Reservations."""
+	converted = {
+		row.booking_inquiry for row in rows
+		if row.reference_doctype == "Reservation" and row.booking_inquiry
+	}
+
+	return [
+		row for row in rows
+		if row.reference_name
+		and not (row.reference_doctype == "Booking Inquiry" and row.reference_name in converted)
+	]
+
+
+@frappe.whitelist()
+def rebuild_guest_directory(page_length=500):
+	"""Re-index the guests of every Booking Inquiry and Reservation, e.g. after installing or importing data."""
+	frappe.only_for("System Manager")
+	frappe.db.delete("Guest Stay")
+	frappe.db.delete("Guest Directory")
+
+	total = 0
+	for doctype in BOOKING_DATES:
+		last_name = ""
+		while True:
+			names = frappe.get_all(
+				doctype,
+				filters={"name": [">", last_name], "docstatus": ["<", 2]},
+				pluck="name",
+				order_by="name asc",
+				limit=page_length,
+			)
+			if not names:
+				break
+			for name in names:
+				index_booking_guests(frappe.get_doc(doctype, name))
+			frappe.db.commit()
+			total += len(names)
+			last_name = names[-1]
+
+	return total
@@ -0,0 +1,32 @@
+# Copyright (c) 2025, wanguimbutu and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from tours_and_safaris.tours_and_safaris.doctype.guest_directory.guest_directory import (
+	get_guest_key,
+	get_history_stays,
+)
+
+
+class TestGuestDirectory(FrappeTestCase):
+	def test_guest_key_prefers_email_then_phone(self):
+		guest = frappe._dict(guest_name="Amina Otieno", email_address="Amina@Example.com", phone_number="0722 000 111")
+		self.assertEqual(get_guest_key(guest, "CUST-1"), "email:amina@example.com")
+
+		guest.email_address = None
+		self.assertEqual(get_guest_key(guest, "CUST-1"), "phone:722000111")
+
+	def test_name_only_guests_are_scoped(self):
+		guest = frappe._dict(guest_name="Amina Otieno", email_address=None, phone_number=None)
+		self.assertNotEqual(get_guest_key(guest, "CUST-1"), get_guest_key(guest, "CUST-2"))
+
+	def test_converted_inquiry_is_not_a_second_stay(self):
+		rows = [
+			frappe._dict(reference_doctype="Reservation", reference_name="RES-1", booking_inquiry="INQ-1"),
+			frappe._dict(reference_doctype="Booking Inquiry", reference_name="INQ-1", booking_inquiry="INQ-1"),
+			frappe._dict(reference_doctype="Booking Inquiry", reference_name="INQ-2", booking_inquiry="INQ-2"),
+		]
+
+		self.assertEqual([row.reference_name for row in get_history_stays(rows)], ["RES-1", "INQ-2"])
@@ -1,10 +1,188 @@
 # Copyright (c) 2025, wanguimbutu and contributors
 # For license information, please see license.txt
 
-#import frappe
+import frappe
 from frappe.model.document import Document
+from frappe.utils import add_days, cint, flt, get_datetime, getdate
+
+INSTRUCTOR_INDEX_CACHE_KEY = "tours_and_safaris:instructor_index"
+DEFAULT_SUGGESTIONS = 10
 
 
 class InstructorAssignment(Document):
-	pass
+	def validate(self):
+		# Offer suggestions until someone has been picked or the table was filled by hand
+		if not self.instructor_name and not self.instructor_suggestions and self.activity:
+			self.set_instructor_suggestions()
+
+	def set_instructor_suggestions(self):
+		self.set("instructor_suggestions", [])
+		for suggestion in get_instructor_suggestions(
+			self.activity, self.from_date, self.to_date, self.session_type, self.level, self.name
+		):
+			self.append("instructor_suggestions", {**suggestion, "no_rate": suggestion["rate"] is None})
+
+
+def get_instructor_index():
+	"""Return the cached matching index, building it with two queries on a miss.
+
+	{"qualified": {activity: {qualification: [instructors]}},
+	 "rates": {(activity, session_type, qualification): rate}}
+	"""
+	def build():
+		qualified = {}
+		for row in frappe.get_all(
+			"Instructor Activity Level",
+			filters={"parenttype": "Instructor"},
+			fields=["parent", "activity_name", "qualification"],
+			order_by="parent asc",
+		):
+			if row.activity_name and row.qualification:
+				instructors = qualified.setdefault(row.activity_name, {}).setdefault(row.qualification, [])
+				if row.parent not in instructors:
+					instructors.append(row.parent)
+
+		rates = {
+			(rate.activity, rate.session_type, rate.qualification): flt(rate.rate)
+			for rate in frappe.get_all("Instructor Rate", fields=["activity", "session_type", "qualification", "rate"])
+		}
+
+		return {"qualified": qualified, "rates": rates}
+
+	return frappe.cache().get_value(INSTRUCTOR_INDEX_CACHE_KEY, generator=build)
+
+
+def clear_instructor_index(doc=None, method=None):
+	frappe.cache().delete_value(INSTRUCTOR_INDEX_CACHE_KEY)
+
+
+def get_rate(rates, activity, session_type, qualification):
+	"""Rate for the exact session type, else the activity/qualification rate without a session type, else None."""
+	rate = rates.get((activity, session_type, qualification))
+	if rate is None:
+		rate = rates.get((activity, None, qualification))
+
+	return rate
+
+
+def get_busy_instructors(instructors, from_date, to_date, exclude_assignment=None):
+	"""Instructors with an assignment overlapping the window, from one query."""
+	if not instructors or not from_date or not to_date:
+		return set()
+
+	return set(frappe.db.sql("""
+		SELECT DISTINCT instructor_name
+		FROM `tabInstructor Assignment`
+		WHERE instructor_name IN %(instructors)s
+			AND docstatus < 2
+			AND from_date < %(to_date)s
+			AND to_date > %(from_date)s
+			AND name != %(exclude)s
+	""", {
+		"instructors": list(instructors),
+		"from_date": get_datetime(from_date),
+		"to_date": get_datetime(to_date),
+		"exclude": exclude_assignment or "",
+	}, pluck=True))
+
+
+def rank_candidates(activity, session_type=None, level=None, index=None):
+	"""Qualified instructors for an activity, best first: requested level, then cheapest rate.
+
+	Each instructor appears once, with the qualification that ranks best.
+	Instructors without a rate come after priced ones and carry a rate of None.
+	"""
+	index = index or get_instructor_index()
+	best = {}
+	for qualification, instructors in index["qualified"].get(activity, {}).items():
+		rate = get_rate(index["rates"], activity, session_type, qualification)
+		key = (
+			0 if not level or qualification == level else 1,
+			rate is None,
+			rate or 0,
+		)
+		for instructor in instructors:
+			if instructor not in best or key < best[instructor][0]:
+				best[instructor] = (key, {"instructor": instructor, "qualification": qualification, "rate": rate})
+
+	return [candidate for _key, candidate in sorted(best.values(), key=lambda item: (item[0], item[1]["instructor"]))]
+
+
+@frappe.whitelist()
+def get_instructor_suggestions(activity, from_date=None, to_date=None, session_type=None, level=None,
+		exclude_assignment=None, limit=DEFAULT_SUGGESTIONS):
+	"""Ranked, priced instructors free for the window: [{instructor, qualification, rate}], rate None if unpriced."""
+	candidates = rank_candidates(activity, session_type, level)
+	busy = get_busy_instructors([c["instructor"] for c in candidates], from_date, to_date, exclude_assignment)
+
+	return [candidate for candidate in candidates if candidate["instructor"] not in busy][:cint(limit) or None]
+
+
+@frappe.whitelist()
+def staff_reservation(reservation_name, session_type=None, limit=3):
+	"""Suggest instructors for every activity of a reservation in one call.
+
+	Activities on the safari itinerary are staffed for their day, the rest for
+	the whole stay. Each activity gets a proposed instructor who is not already
+	proposed for an overlapping activity of this reservation, plus alternatives.
+	The reservation's own existing assignments do not make anyone busy.
+	"""
+	reservation = frappe.get_doc("Reservation", reservation_name)
+	frappe.has_permission("Reservation", "read", reservation, throw=True)
+
+	windows = []
+	for row in reservation.get("safari_reservation", []):
+		if row.adventure and row.day:
+			windows.append((row.adventure, get_datetime(row.day), get_datetime(add_days(getdate(row.day), 1))))
+	on_itinerary = {activity for activity, _from, _to in windows}
+	for row in reservation.get("activities", []):
+		if not (reservation.arrival_date and reservation.depature_date):
+			break
+		if row.activity_name and row.activity_name not in on_itinerary:
+			windows.append((row.activity_name, get_datetime(reservation.arrival_date), get_datetime(reservation.depature_date)))
+
+	index = get_instructor_index()
+	candidates = {activity: rank_candidates(activity, session_type, index=index) for activity in {w[0] for w in windows}}
+	all_instructors = {c["instructor"] for ranked in candidates.values() for c in ranked}
+
+	# One query for every assignment touching the stay, checked per window in memory
+	if windows and all_instructors:
+		booked = frappe.db.sql("""
+			SELECT instructor_name, from_date, to_date
+			FROM `tabInstructor Assignment`
+			WHERE instructor_name IN %(instructors)s
+				AND docstatus < 2
+				AND from_date < %(to_date)s
+				AND to_date > %(from_date)s
+				AND IFNULL(reservation, '') != %(reservation)s
+		""", {
+			"instructors": list(all_instructors),
+			"reservation": reservation.name,
+			"from_date": min(w[1] for w in windows),
+			"to_date": max(w[2] for w in windows),
+		}, as_dict=True)
+	else:
+		booked = []
+
+	def is_free(instructor, from_date, to_date, proposed):
+		for row in booked + proposed:
+			if row["instructor_name"] == instructor and row["from_date"] < to_date and row["to_date"] > from_date:
+				return False
+		return True
+
+	proposed, staffing = [], []
+	for activity, from_date, to_date in sorted(windows, key=lambda w: w[1]):
+		free = [c for c in candidates[activity] if is_free(c["instructor"], from_date, to_date, [])]
+		pick = next((c for c in free if is_free(c["instructor"], from_date, to_date, proposed)), None)
+		if pick:
+			proposed.append({"instructor_name": pick["instructor"], "from_date": from_date, "to_date": to_date})
+
+		staffing.append({
+			"activity": activity,
+			"from_date": from_date,
+			"to_date": to_date,
+			"proposed": pick,
+			"suggestions": free[:cint(limit) or None],
+		})
 
+	return staffing
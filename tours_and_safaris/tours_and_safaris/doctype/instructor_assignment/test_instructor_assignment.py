@@ -1,9 +1,60 @@
 # Copyright (c) 2025, wanguimbutu and Contributors
 # See license.txt
 
-# import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from tours_and_safaris.tours_and_safaris.doctype.instructor_assignment.instructor_assignment import (
+	get_rate,
+	rank_candidates,
+)
+
+INDEX = {
+	"qualified": {
+		"Kayaking": {
+			"Level 1": ["Amani", "Baraka", "Chege"],
+			"Level 2": ["Baraka", "Dalia"],
+		},
+	},
+	"rates": {
+		("Kayaking", "Half Day", "Level 1"): 50.0,
+		("Kayaking", None, "Level 1"): 80.0,
+		("Kayaking", None, "Level 2"): 120.0,
+	},
+}
+
 
 class TestInstructorAssignment(FrappeTestCase):
-	pass
+	def test_rate_falls_back_to_any_session_type(self):
+		self.assertEqual(get_rate(INDEX["rates"], "Kayaking", "Half Day", "Level 1"), 50.0)
+		self.assertEqual(get_rate(INDEX["rates"], "Kayaking", "Full Day", "Level 1"), 80.0)
+		self.assertEqual(get_rate(INDEX["rates"], "Kayaking", "Full Day", "Level 2"), 120.0)
+
+	def test_missing_rate_is_none(self):
+		self.assertIsNone(get_rate(INDEX["rates"], "Kayaking", "Half Day", "Level 3"))
+		self.assertIsNone(get_rate(INDEX["rates"], "Climbing", None, "Level 1"))
+
+	def test_requested_level_then_cheapest(self):
+		ranked = rank_candidates("Kayaking", "Half Day", "Level 2", index=INDEX)
+
+		self.assertEqual(
+			[(c["instructor"], c["qualification"], c["rate"]) for c in ranked],
+			[
+				("Baraka", "Level 2", 120.0),
+				("Dalia", "Level 2", 120.0),
+				("Amani", "Level 1", 50.0),
+				("Chege", "Level 1", 50.0),
+			],
+		)
+
+	def test_unpriced_qualification_ranks_last(self):
+		index = {
+			"qualified": {"Kayaking": {"Level 1": ["Amani"], "Level 3": ["Erasto"]}},
+			"rates": {("Kayaking", None, "Level 1"): 80.0},
+		}
+
+		ranked = rank_candidates("Kayaking", index=index)
+		self.assertEqual([c["instructor"] for c in ranked], ["Amani", "Erasto"])
+		self.assertIsNone(ranked[1]["rate"])
+
+	def test_unqualified_activity_has_no_candidates(self):
+		self.assertEqual(rank_candidates("Climbing", index=INDEX), [])
@@ -1,9 +1,231 @@
 # Copyright (c) 2025, wanguimbutu and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
+from frappe.utils import cint, getdate, now_datetime
+
+from tours_and_safaris.tours_and_safaris.doctype.availability.availability import HOLDING_STATUSES, set_room_status
+from tours_and_safaris.tours_and_safaris.doctype.availability.availability_index import invalidate_rooms
+from tours_and_safaris.utils import bulk_insert_docs, get_chunk_size
+
+MAINTENANCE_LOG_BULK_FIELDS = ("room", "reservation", "maintenance_date", "remarks", "status")
 
 
 class MaintenanceLog(Document):
 	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Maintenance Log", ["status", "room"])
+
+
+@frappe.whitelist()
+def get_housekeeping_queue(limit=50, include_claimed=0):
+	"""Pending cleaning logs, most urgent first: ordered by the room's next arrival.
+
+	The next arrival is the earliest upcoming Availability row holding the room,
+	or the earliest upcoming submitted reservation booking it.
+	"""
+	frappe.has_permission("Maintenance Log", "read", throw=True)
+	statuses = ("Pending", "On-going") if cint(include_claimed) else ("Pending",)
+
+	return frappe.db.sql("""
+		SELECT log.name, log.room, log.reservation, log.status, log.cleaned_by,
+			log.maintenance_date, next_arrival.arrival_date AS next_arrival
+		FROM `tabMaintenance Log` log
+		LEFT JOIN (
+			SELECT room, MIN(arrival_date) AS arrival_date
+			FROM (
+				SELECT availability.room_name AS room, availability.arrival_date
+				FROM `tabAvailability` availability
+				WHERE availability.arrival_date >= %(today)s
+					AND availability.status IN %(holding)s
+					AND availability.docstatus < 2
+				UNION ALL
+				SELECT booking.room_name AS room, reservation.arrival_date
+				FROM `tabReservation` reservation
+				JOIN `tabInquiry Room Booking` booking
+					ON booking.parent = reservation.name
+					AND booking.parenttype = 'Reservation'
+					AND booking.parentfield = 'room_booking'
+				WHERE reservation.arrival_date >= %(today)s
+					AND reservation.docstatus = 1
+			) arrivals
+			GROUP BY room
+		) next_arrival ON next_arrival.room = log.room
+		WHERE log.status IN %(statuses)s AND log.docstatus = 0
+		ORDER BY next_arrival.arrival_date IS NULL, next_arrival.arrival_date,
+			log.maintenance_date, log.creation
+		LIMIT %(limit)s
+	""", {
+		"today": getdate(),
+		"holding": HOLDING_STATUSES,
+		"statuses": statuses,
+		"limit": cint(limit) or 50,
+	}, as_dict=True)
+
+
+@frappe.whitelist()
+def claim_housekeeping_task(maintenance_log_name=None):
+	"""Claim a cleaning log for the current user: the given one, or the most urgent free one.
+
+	Uses row locks with SKIP LOCKED, so cleaners claiming at the same time each
+	get a different log. Returns the claimed log, or None when nothing is left.
+	"""
+	frappe.has_permission("Maintenance Log", "write", throw=True)
+	if maintenance_log_name:
+		candidates = [maintenance_log_name]
+	else:
+		candidates = [log.name for log in get_housekeeping_queue(limit=20)]
+
+	for name in candidates:
+		if frappe.db.sql("""
+			SELECT name FROM `tabMaintenance Log`
+			WHERE name = %s AND status = 'Pending' AND docstatus = 0
+			FOR UPDATE SKIP LOCKED
+		""", (name,)):
+			frappe.db.sql("""
+				UPDATE `tabMaintenance Log`
+				SET status = 'On-going', cleaned_by = %(user)s, modified = %(now)s, modified_by = %(user)s
+				WHERE name = %(name)s
+			""", {"name": name, "user": frappe.session.user, "now": now_datetime()})
+			frappe.db.commit()
+
+			return frappe.db.get_value(
+				"Maintenance Log", name, ["name", "room", "reservation", "status", "cleaned_by"], as_dict=True
+			)
+
+	if maintenance_log_name:
+		frappe.throw("This maintenance log has already been claimed or completed.")
+
+
+def enqueue_checkout_housekeeping(reservation_name):
+	"""Queue the housekeeping fan-out for a checked-out reservation once the request commits."""
+	frappe.enqueue(
+		"tours_and_safaris.tours_and_safaris.doctype.maintenance_log.maintenance_log.run_checkout_housekeeping",
+		queue="short",
+		job_id=f"checkout_housekeeping::{reservation_name}",
+		deduplicate=True,
+		enqueue_after_commit=True,
+		now=frappe.flags.in_test,
+		reservation_name=reservation_name,
+	)
+
+
+def run_checkout_housekeeping(reservation_name):
+	"""Create cleaning logs and flag the rooms of a checked-out reservation for maintenance.
+
+	Idempotent per reservation: rooms that already have a log for it are
+	neither logged nor flagged again, and the reservation row is locked so two
+	runs cannot interleave.
+	"""
+	if not frappe.db.sql(
+		"SELECT name FROM `tabReservation` WHERE name = %s FOR UPDATE", (reservation_name,)
+	):
+		return
+
+	room_names = frappe.get_all(
+		"Inquiry Room Booking",
+		filters={"parenttype": "Reservation", "parentfield": "room_booking", "parent": reservation_name},
+		pluck="room_name",
+		order_by="idx asc",
+	)
+	room_names = list(dict.fromkeys(room_name for room_name in room_names if room_name))
+	if not room_names:
+		return
+
+	logged = set(frappe.get_all(
+		"Maintenance Log",
+		filters={"reservation": reservation_name, "room": ["in", room_names], "docstatus": ["<", 2]},
+		pluck="room",
+	))
+
+	# Rooms logged by an earlier run may already be cleaned and must keep their status
+	new_rooms = [room_name for room_name in room_names if room_name not in logged]
+	if not new_rooms:
+		return
+
+	bulk_insert_docs("Maintenance Log", MAINTENANCE_LOG_BULK_FIELDS, [
+		{
+			"room": room_name,
+			"reservation": reservation_name,
+			"maintenance_date": getdate(),
+			"remarks": "Routine cleaning after check-out",
+			"status": "Pending",
+		}
+		for room_name in new_rooms
+	])
+
+	set_room_status(new_rooms, "Under Maintenance")
+	invalidate_rooms(*new_rooms)
+	frappe.db.commit()
+
+
+def get_outstanding_maintenance(reservation_names):
+	"""Return {reservation: number of maintenance logs not yet completed} in one grouped query."""
+	if not reservation_names:
+		return {}
+
+	return dict(frappe.db.sql("""
+		SELECT reservation, COUNT(*)
+		FROM `tabMaintenance Log`
+		WHERE reservation IN %(reservations)s
+			AND status != 'Completed'
+			AND docstatus < 2
+		GROUP BY reservation
+	""", {"reservations": list(reservation_names)}))
+
+
+def complete_cleaned_reservations(reservation_names):
+	"""Mark reservations Completed when none of their maintenance logs is outstanding.
+
+	Returns the reservations that were completed.
+	"""
+	reservation_names = list({name for name in reservation_names if name})
+	outstanding = get_outstanding_maintenance(reservation_names)
+	cleaned = [name for name in reservation_names if not outstanding.get(name)]
+
+	if cleaned:
+		frappe.db.sql("""
+			UPDATE `tabReservation`
+			SET status = 'Completed', modified = %(now)s, modified_by = %(user)s
+			WHERE name IN %(names)s AND status != 'Completed'
+		""", {"names": cleaned, "now": now_datetime(), "user": frappe.session.user})
+
+	return cleaned
+
+
+@frappe.whitelist()
+def complete_maintenance_logs(maintenance_log_names, chunk_size=None):
+	"""Complete many maintenance logs at once, free their rooms and complete cleaned reservations.
+
+	Each log is submitted through the document API, so permissions,
+	validation and submit hooks run exactly as for a single completion.
+	Every chunk is committed on its own.
+	"""
+	frappe.has_permission("Maintenance Log", "submit", throw=True)
+
+	maintenance_log_names = list(dict.fromkeys(frappe.parse_json(maintenance_log_names) or []))
+	chunk_size = get_chunk_size(chunk_size)
+	completed, reservations_completed = [], []
+
+	for chunk_start in range(0, len(maintenance_log_names), chunk_size):
+		logs = []
+		for name in maintenance_log_names[chunk_start:chunk_start + chunk_size]:
+			# Locked so a concurrent claim or completion waits for us
+			log = frappe.get_doc("Maintenance Log", name, for_update=True)
+			if log.docstatus != 0 or log.status not in ("Pending", "On-going"):
+				continue
+
+			log.status = "Completed"
+			log.cleaned_by = log.cleaned_by or frappe.session.user
+			log.submit()
+			logs.append(log)
+
+		set_room_status(list({log.room for log in logs if log.room}), "Available")
+		reservations_completed += complete_cleaned_reservations([log.reservation for log in logs])
+		frappe.db.commit()
+		completed += [log.name for log in logs]
+
+	return {"completed": completed, "reservations_completed": reservations_completed}
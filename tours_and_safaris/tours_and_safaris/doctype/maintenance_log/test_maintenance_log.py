@@ -1,9 +1,24 @@
 # Copyright (c) 2025, wanguimbutu and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from tours_and_safaris.tours_and_safaris.doctype.maintenance_log.maintenance_log import complete_maintenance_logs
+
 
 class TestMaintenanceLog(FrappeTestCase):
-	pass
+	def make_log(self, status="Pending"):
+		return frappe.get_doc({"doctype": "Maintenance Log", "status": status}).insert()
+
+	def test_complete_maintenance_logs_submits_each_log(self):
+		pending, claimed, done = self.make_log(), self.make_log("On-going"), self.make_log("Completed")
+
+		result = complete_maintenance_logs([pending.name, claimed.name, done.name, pending.name], chunk_size=1)
+
+		self.assertEqual(result["completed"], [pending.name, claimed.name])
+		for log in (pending, claimed):
+			log.reload()
+			self.assertEqual((log.docstatus, log.status), (1, "Completed"))
+			self.assertEqual(log.cleaned_by, frappe.session.user)
+		self.assertEqual(frappe.db.get_value("Maintenance Log", done.name, "docstatus"), 0)
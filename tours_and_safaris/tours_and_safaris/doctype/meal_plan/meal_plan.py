@@ -0,0 +1,222 @@
+# Copyright (c) 2025, wanguimbutu and contributors
+# For license information, please see license.txt
+
+"""Kitchen covers per date, meal and dietary preference across submitted reservations.
+
+Each reservation's covers are stored as Meal Plan Entry rows. Meal Plan
+holds their running total per (meal_date, meal, dietary_preference). When a
+reservation is submitted, changed or cancelled, its old entries are removed,
+the new ones written, and only the net difference is applied to the totals.
+"""
+
+import re
+from collections import Counter
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_days, cint, date_diff, getdate, now_datetime
+
+from tours_and_safaris.utils import bulk_insert_docs
+
+MEAL_PLAN_ENTRY_BULK_FIELDS = ("reservation", "meal_date", "meal", "dietary_preference", "covers")
+
+# Meals served on stay days without an itinerary row when no Meal Type is set up
+DEFAULT_MEALS = ("Full Board",)
+# Stored for guests without a dietary preference
+NO_PREFERENCE = ""
+
+
+class MealPlan(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_unique("Meal Plan", ["meal_date", "meal", "dietary_preference"])
+
+
+def get_diet_covers(reservation):
+	"""Counter of guests per dietary preference; without guest rows everyone is counted as no preference."""
+	guests = reservation.get("guest_details") or []
+	if not guests:
+		return Counter({NO_PREFERENCE: cint(reservation.no_of_people)}) if cint(reservation.no_of_people) else Counter()
+
+	return Counter(guest.dietary_preference or NO_PREFERENCE for guest in guests)
+
+
+def split_meals(meals):
+	return [meal.strip() for meal in re.split(r"[,\n/]+", meals or "") if meal.strip()]
+
+
+def get_reservation_meals(reservation, default_meals):
+	"""{meal_date: [meals]} for every day of the stay, arrival and departure days included.
+
+	Safari itinerary rows set the meals for their day. Other days get
+	`default_meals`, except the departure day: guests leave during it, so only
+	meals its itinerary row lists are counted.
+	"""
+	if not reservation.arrival_date or not reservation.depature_date:
+		return {}
+
+	start_date = getdate(reservation.arrival_date)
+	nights = max(date_diff(getdate(reservation.depature_date), start_date), 0)
+	meals_by_date = {add_days(start_date, day): list(default_meals) for day in range(nights)}
+	meals_by_date[add_days(start_date, nights)] = []
+
+	planned = {}
+	for row in reservation.get("safari_reservation") or []:
+		if row.day and split_meals(row.meals):
+			planned.setdefault(getdate(row.day), []).extend(split_meals(row.meals))
+	for meal_date, meals in planned.items():
+		meals_by_date[meal_date] = list(dict.fromkeys(meals))
+
+	return meals_by_date
+
+
+def get_meal_plan_entries(reservation, default_meals=None):
+	"""Meal Plan Entry rows for a reservation: one per date, meal and dietary preference."""
+	if default_meals is None:
+		default_meals = frappe.get_all("Meal Type", pluck="name", order_by="creation asc") or DEFAULT_MEALS
+
+	diet_covers = get_diet_covers(reservation)
+	return [
+		{
+			"reservation": reservation.name,
+			"meal_date": meal_date,
+			"meal": meal,
+			"dietary_preference": diet,
+			"covers": covers,
+		}
+		for meal_date, meals in get_reservation_meals(reservation, default_meals).items()
+		for meal in meals
+		for diet, covers in diet_covers.items()
+		if covers
+	]
+
+
+def apply_deltas(deltas):
+	"""Add {(meal_date, meal, diet): covers} to the Meal Plan totals, dropping rows that reach zero."""
+	deltas = {key: covers for key, covers in deltas.items() if covers}
+	if not deltas:
+		return
+
+	now, user = now_datetime(), frappe.session.user
+	for (meal_date, meal, diet), covers in deltas.items():
+		frappe.db.sql("""
+			INSERT INTO `tabMeal Plan`
+				(name, creation, modified, owner, modified_by, docstatus,
+				meal_date, meal, dietary_preference, covers)
+			VALUES
+				(%(name)s, %(now)s, %(now)s, %(user)s, %(user)s, 0,
+				%(meal_date)s, %(meal)s, %(diet)s, %(covers)s)
+			ON DUPLICATE KEY UPDATE
+				covers = covers + VALUES(covers),
+				modified = VALUES(modified)
+		""", {
+			"name": frappe.generate_hash(length=10),
+			"now": now,
+			"user": user,
+			"meal_date": meal_date,
+			"meal": meal,
+			"diet": diet,
+			"covers": covers,
+		})
+
+	frappe.db.sql("""
+		DELETE FROM `tabMeal Plan`
+		WHERE meal_date IN %(dates)s AND covers <= 0
+	""", {"dates": list({meal_date for meal_date, _meal, _diet in deltas})})
+
+
+def sync_meal_plan(reservation):
+	"""Replace a submitted reservation's entries and move the totals by the difference."""
+	deltas = Counter()
+	for entry in remove_entries(reservation.name):
+		deltas[(getdate(entry.meal_date), entry.meal, entry.dietary_preference)] -= cint(entry.covers)
+
+	entries = get_meal_plan_entries(reservation)
+	bulk_insert_docs("Meal Plan Entry", MEAL_PLAN_ENTRY_BULK_FIELDS, entries)
+	for entry in entries:
+		deltas[(entry["meal_date"], entry["meal"], entry["dietary_preference"])] += entry["covers"]
+
+	apply_deltas(deltas)
+
+
+def clear_meal_plan(reservation_name):
+	"""Take a reservation's covers out of the totals, e.g. on cancel."""
+	deltas = Counter()
+	for entry in remove_entries(reservation_name):
+		deltas[(getdate(entry.meal_date), entry.meal, entry.dietary_preference)] -= cint(entry.covers)
+
+	apply_deltas(deltas)
+
+
+def remove_entries(reservation_name):
+	"""Delete and return a reservation's Meal Plan Entry rows."""
+	entries = frappe.get_all(
+		"Meal Plan Entry",
+		filters={"reservation": reservation_name},
+		fields=["meal_date", "meal", "dietary_preference", "covers"],
+	)
+	if entries:
+		frappe.db.delete("Meal Plan Entry", {"reservation": reservation_name})
+
+	return entries
+
+
+def get_meal_plan(from_date, to_date, meal=None):
+	"""Meal Plan rows between two dates (inclusive), read through the meal_date index."""
+	conditions = "AND meal = %(meal)s" if meal else ""
+
+	return frappe.db.sql(f"""
+		SELECT meal_date, meal, dietary_preference, covers
+		FROM `tabMeal Plan`
+		WHERE meal_date BETWEEN %(from_date)s AND %(to_date)s
+			{conditions}
+		ORDER BY meal_date, meal, dietary_preference
+	""", {"from_date": getdate(from_date), "to_date": getdate(to_date), "meal": meal}, as_dict=True)
+
+
+@frappe.whitelist()
+def get_kitchen_covers(from_date, to_date, meal=None):
+	"""Covers per date x meal x dietary preference for the kitchen."""
+	frappe.has_permission("Meal Plan", "read", throw=True)
+	return get_meal_plan(from_date, to_date, meal)
+
+
+@frappe.whitelist()
+def rebuild_meal_plan(page_length=500):
+	"""Recompute every submitted reservation's entries and the totals, e.g. after installing."""
+	frappe.only_for("System Manager")
+	frappe.db.delete("Meal Plan Entry")
+	frappe.db.delete("Meal Plan")
+
+	default_meals = frappe.get_all("Meal Type", pluck="name", order_by="creation asc") or DEFAULT_MEALS
+	totals = Counter()
+	last_name = ""
+	while True:
+		names = frappe.get_all(
+			"Reservation",
+			filters={"docstatus": 1, "name": [">", last_name]},
+			pluck="name",
+			order_by="name asc",
+			limit=page_length,
+		)
+		if not names:
+			break
+
+		entries = []
+		for name in names:
+			entries += get_meal_plan_entries(frappe.get_doc("Reservation", name), default_meals)
+		bulk_insert_docs("Meal Plan Entry", MEAL_PLAN_ENTRY_BULK_FIELDS, entries)
+		for entry in entries:
+			totals[(entry["meal_date"], entry["meal"], entry["dietary_preference"])] += entry["covers"]
+		last_name = names[-1]
+
+	bulk_insert_docs("Meal Plan", ("meal_date", "meal", "dietary_preference", "covers"), [
+		{"meal_date": meal_date, "meal": meal, "dietary_preference": diet, "covers": covers}
+		for (meal_date, meal, diet), covers in totals.items()
+		if covers
+	])
+	frappe.db.commit()
+
+	return len(totals)
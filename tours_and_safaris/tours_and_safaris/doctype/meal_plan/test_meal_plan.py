@@ -0,0 +1,53 @@
+# Copyright (c) 2025, wanguimbutu and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import getdate
+
+from tours_and_safaris.tours_and_safaris.doctype.meal_plan.meal_plan import (
+	get_meal_plan_entries,
+	get_reservation_meals,
+)
+
+
+class TestMealPlan(FrappeTestCase):
+	def test_entries_follow_itinerary_and_diets(self):
+		reservation = frappe._dict(
+			name="RES-1",
+			arrival_date="2025-05-01 12:00:00",
+			depature_date="2025-05-02 10:00:00",
+			no_of_people=3,
+			guest_details=[
+				frappe._dict(dietary_preference="Vegan"),
+				frappe._dict(dietary_preference=None),
+				frappe._dict(dietary_preference=None),
+			],
+			safari_reservation=[frappe._dict(day="2025-05-02", meals="Breakfast, Packed Lunch")],
+		)
+
+		entries = get_meal_plan_entries(reservation, default_meals=("Breakfast", "Lunch", "Dinner"))
+		covers = {(entry["meal_date"], entry["meal"], entry["dietary_preference"]): entry["covers"] for entry in entries}
+
+		self.assertEqual(covers[(getdate("2025-05-01"), "Dinner", "")], 2)
+		self.assertEqual(covers[(getdate("2025-05-01"), "Dinner", "Vegan")], 1)
+		self.assertEqual(covers[(getdate("2025-05-02"), "Packed Lunch", "Vegan")], 1)
+		self.assertNotIn((getdate("2025-05-02"), "Dinner", ""), covers)
+		self.assertEqual(len(entries), (3 + 2) * 2)
+
+	def test_departure_day_counts_only_itinerary_meals(self):
+		reservation = frappe._dict(
+			name="RES-2",
+			arrival_date="2025-05-01",
+			depature_date="2025-05-03",
+			no_of_people=2,
+			guest_details=[],
+			safari_reservation=[],
+		)
+
+		meals = get_reservation_meals(reservation, ("Breakfast", "Lunch", "Dinner"))
+		self.assertEqual(meals[getdate("2025-05-02")], ["Breakfast", "Lunch", "Dinner"])
+		self.assertEqual(meals[getdate("2025-05-03")], [])
+
+		reservation.safari_reservation = [frappe._dict(day="2025-05-03", meals="Breakfast")]
+		self.assertEqual(get_reservation_meals(reservation, ("Breakfast", "Lunch", "Dinner"))[getdate("2025-05-03")], ["Breakfast"])
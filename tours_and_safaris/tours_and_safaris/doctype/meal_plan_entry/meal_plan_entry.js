@@ -0,0 +1,8 @@
+// Copyright (c) 2025, wanguimbutu and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Meal Plan Entry", {
+// 	refresh(frm) {
+
+// 	},
+// });
@@ -1,107 +1,23 @@
 frappe.ui.form.on("Reservation", {
     refresh: function (frm) {
-        calculate_total_cost(frm);
         toggle_accommodation_fields(frm);
 
         if (frm.doc.accommodation_type === "Rooms") {
             frm.set_df_property("room_booking", "hidden", 0);
         }
 
-        if (frm.doc.status === "Confirmed Reservation") {
-            frappe.call({
-                method: "tours_and_safaris.tours_and_safaris.doctype.reservation.reservation.update_availability_status",
-                args: {
-                    reservation_id: frm.doc.name,
-                    status:"Confirmed Reservation"
-                },
-                callback: function(response) {
-                    if (response.message === "success") {
-                        frappe.msgprint("Availability updated successfully.");
-                    }
-                }
-            });
-        }
+        if (frm.is_new()) return;
 
-        if (frm.doc.docstatus === 1) {
-            // Check if a quotation already exists for this reservation
-            frappe.call({
-                method: "frappe.client.get_list",
-                args: {
-                    doctype: "Quotation",
-                    filters: {
-                        "custom_reservation": frm.doc.name,
-                        "docstatus": 1  // Submitted quotations
-                    },
-                    fields: ["name"]
-                },
-                callback: function(response) {
-                    if (response.message && response.message.length > 0) {
-                        frm.remove_custom_button(__('Create Quotation'));
-                    } else {
-                        frm.add_custom_button('Create Quotation', function () {
-                            frappe.call({
-                                method: "tours_and_safaris.tours_and_safaris.doctype.reservation.reservation.create_quotation",
-                                args: { reservation_name: frm.doc.name },
-                                callback: function (response) {
-                                    if (response.message) {
-                                        frappe.msgprint({
-                                            title: __("Success"),
-                                            message: `Quotation <a href="/app/quotation/${response.message}" target="_blank">${response.message}</a> created successfully.`,
-                                            indicator: "green"
-                                        });
-                                    }
-                                }
-                            });
-                        }, __("Actions"));
-                    }
+        // One read-only call for cost, quotation, check-in/out and availability state
+        frappe.call({
+            method: "tours_and_safaris.tours_and_safaris.doctype.reservation.reservation.get_form_bootstrap",
+            args: { reservation_name: frm.doc.name },
+            callback: function (response) {
+                if (response.message) {
+                    apply_form_bootstrap(frm, response.message);
                 }
-            });
-        }
-
-        // Check-In Button Logic
-        if (frm.doc.room_booking && frm.doc.room_booking.length > 0 && !frm.doc.checked_in) {
-            frm.add_custom_button("Check-In", function () {
-                frappe.call({
-                    method: "tours_and_safaris.tours_and_safaris.doctype.reservation.reservation.create_check_in",
-                    args: {
-                        reservation_name: frm.doc.name
-                    },
-                    callback: function (response) {
-                        if (response.message) {
-                            frappe.msgprint({
-                                title: __("Success"),
-                                message: `Check-In recorded successfully for ${frm.doc.customer_name}.`,
-                                indicator: "green"
-                            });
-                            frm.reload_doc();
-                        }
-                    }
-                });
-            }, __("Actions"));
-        }
-
-        // Check-Out Button Logic
-        let today = frappe.datetime.get_today();
-        if (frm.doc.checked_in && frm.doc.depature_date <= today && !frm.doc.checked_out) {
-            frm.add_custom_button("Check-Out", function () {
-                frappe.call({
-                    method: "tours_and_safaris.tours_and_safaris.doctype.reservation.reservation.create_check_out",
-                    args: {
-                        reservation_name: frm.doc.name
-                    },
-                    callback: function (response) {
-                        if (response.message) {
-                            frappe.msgprint({
-                                title: __("Success"),
-                                message: `Check-Out recorded and maintenance log created.`,
-                                indicator: "green"
-                            });
-                            frm.reload_doc();
-                        }
-                    }
-                });
-            }, __("Actions"));
-        }
+            }
+        });
     },
     activity: function (frm) {
         if (frm.doc.activity === "Safari") {
@@ -200,6 +116,82 @@ frappe.ui.form.on("Reservation", {
 
 
 
+function apply_form_bootstrap(frm, data) {
+    if (frm.doc.docstatus === 0 && frm.doc.proposed_total_cost !== data.total_cost) {
+        frm.set_value("proposed_total_cost", data.total_cost);
+    }
+
+    let statuses = Object.keys(data.availability_status || {});
+    if (statuses.length) {
+        frm.dashboard.set_headline(__("Availability: {0}",
+            [statuses.map(status => `${data.availability_status[status]} ${status}`).join(", ")]));
+    }
+
+    if (frm.doc.docstatus === 1 && !data.quotation_exists) {
+        frm.add_custom_button('Create Quotation', function () {
+            frappe.call({
+                method: "tours_and_safaris.tours_and_safaris.doctype.reservation.reservation.create_quotation",
+                args: { reservation_name: frm.doc.name },
+                callback: function (response) {
+                    if (response.message) {
+                        frappe.msgprint({
+                            title: __("Success"),
+                            message: `Quotation <a href="/app/quotation/${response.message}" target="_blank">${response.message}</a> created successfully.`,
+                            indicator: "green"
+                        });
+                        frm.reload_doc();
+                    }
+                }
+            });
+        }, __("Actions"));
+    }
+
+    // Check-In Button Logic
+    if (frm.doc.room_booking && frm.doc.room_booking.length > 0 && !data.checked_in) {
+        frm.add_custom_button("Check-In", function () {
+            frappe.call({
+                method: "tours_and_safaris.tours_and_safaris.doctype.reservation.reservation.create_check_in",
+                args: {
+                    reservation_name: frm.doc.name
+                },
+                callback: function (response) {
+                    if (response.message) {
+                        frappe.msgprint({
+                            title: __("Success"),
+                            message: `Check-In recorded successfully for ${frm.doc.customer_name}.`,
+                            indicator: "green"
+                        });
+                        frm.reload_doc();
+                    }
+                }
+            });
+        }, __("Actions"));
+    }
+
+    // Check-Out Button Logic
+    let today = frappe.datetime.get_today();
+    if (data.checked_in && frm.doc.depature_date <= today && !data.checked_out) {
+        frm.add_custom_button("Check-Out", function () {
+            frappe.call({
+                method: "tours_and_safaris.tours_and_safaris.doctype.reservation.reservation.create_check_out",
+                args: {
+                    reservation_name: frm.doc.name
+                },
+                callback: function (response) {
+                    if (response.message) {
+                        frappe.msgprint({
+                            title: __("Success"),
+                            message: `Check-Out recorded and maintenance log created.`,
+                            indicator: "green"
+                        });
+                        frm.reload_doc();
+                    }
+                }
+            });
+        }, __("Actions"));
+    }
+}
+
 function calculate_total_cost(frm) {
     if (!frm.doc.name) return;
 
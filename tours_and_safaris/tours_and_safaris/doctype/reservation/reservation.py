@@ -1,54 +1,114 @@
 # Copyright (c) 2025, wanguimbutu and contributors
 # For license information, please see license.txt
 
+import time
+
 import frappe
 from frappe.model.document import Document
-from frappe.utils import getdate, now_datetime
+from frappe.utils import add_days, getdate, now_datetime
+
+from tours_and_safaris.tours_and_safaris.doctype.availability.availability import (
+    RoomConflictError,
+    bulk_insert_availability,
+    delete_availability,
+    ensure_rooms_free,
+    format_room_conflicts,
+    get_nightly_rows,
+    lock_and_check_rooms,
+)
+from tours_and_safaris.tours_and_safaris.doctype.availability.availability_index import (
+    get_free_rooms,
+    invalidate_reservation_rooms,
+    invalidate_rooms,
+)
+from tours_and_safaris.tours_and_safaris.doctype.maintenance_log.maintenance_log import (
+    complete_cleaned_reservations,
+    enqueue_checkout_housekeeping,
+)
+from tours_and_safaris.tours_and_safaris.doctype.meal_plan.meal_plan import clear_meal_plan, sync_meal_plan
+from tours_and_safaris.tours_and_safaris.doctype.reservation.reservation_pricing import (
+    FORM_BOOTSTRAP_CACHE_KEY,
+    calculate_total_costs,
+)
+from tours_and_safaris.tours_and_safaris.doctype.tents.tents import ensure_tents_available
+from tours_and_safaris.tours_and_safaris.doctype.vehicle_allocation.vehicle_allocation import (
+    clear_vehicle_allocations,
+    sync_vehicle_allocations,
+    validate_vehicle_allocations,
+)
 
 class Reservation(Document):
     def on_submit(self):
-        """Create an availability record when a reservation is submitted."""
-    
+        """Create availability records for every booked room and tent when a reservation is submitted."""
+
         if not self.room_booking and not self.tent_selection:
             frappe.msgprint("Warning: No accommodation selected for this reservation.")  # Soft warning
-    
-    # Process rooms
-        for room in self.get("room_booking", []):
-            self.create_availability_record(room, "Room")
 
-    # Process tents
-        for tent in self.get("tent_selection", []):
-            self.create_availability_record(tent, "Tent")
+        started = time.perf_counter()
+
+        # Lock the rooms and make sure no other reservation holds them for these dates
+        ensure_rooms_free(
+            [room.room_name for room in self.get("room_booking", []) if room.room_name],
+            self.arrival_date,
+            self.depature_date,
+            self.name,
+        )
+
+        # Tents are counted against each type's nightly stock
+        ensure_tents_available(self)
+
+        rows = [self.get_availability_row(room, "Room") for room in self.get("room_booking", [])]
+        rows += [self.get_availability_row(tent, "Tent") for tent in self.get("tent_selection", [])]
+
+        # Written in one statement and committed with the submit itself, so a
+        # failure leaves no partial availability behind
+        bulk_insert_availability(rows, docstatus=1)
+
+        sync_meal_plan(self)
+
+        frappe.logger().debug(
+            f"Reservation {self.name}: created {len(rows)} availability records "
+            f"in {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
 
-    def create_availability_record(self, accommodation, acc_type):
+    def get_availability_row(self, accommodation, acc_type):
         acc_name = accommodation.get("room_name") if acc_type == "Room" else accommodation.get("tent_type")
-    
-        frappe.logger().info(f"Creating availability for {acc_type}: {acc_name}")
 
-        availability = frappe.get_doc({
-            "doctype": "Availability",
+        return {
             "room_name" if acc_type == "Room" else "tent_type": acc_name,
             "arrival_date": self.arrival_date,
             "depature_date": self.depature_date,
             "status": "Reserved",
             "reservation": self.name
-        })
-    
-        availability.insert()
-        availability.submit()
-        frappe.db.commit()
+        }
+
+
+    def validate(self):
+        validate_vehicle_allocations(self)
+
+    def on_update(self):
+        sync_vehicle_allocations(self)
 
+    def on_update_after_submit(self):
+        sync_vehicle_allocations(self)
+        sync_meal_plan(self)
 
     def on_cancel(self):
         """Remove availability record if reservation is canceled."""
-        frappe.db.delete("Availability", {"reservation": self.name})
+        delete_availability(self.name)
+        clear_vehicle_allocations(self.name)
+        clear_meal_plan(self.name)
+
+    def on_trash(self):
+        clear_vehicle_allocations(self.name)
 
     def before_save(self):
         """Automatically update no_of_people, no_of_adults, and no_of_children based on guest_details."""
         
         if self.guest_details:
             no_of_people = len(self.guest_details)
-            no_of_adults = sum(1 for guest in self.guest_details if int(guest.age) >= 18)
+            # Age is the Child/Adult select copied from the Booking Inquiry
+            no_of_adults = sum(1 for guest in self.guest_details if (guest.age or "").lower() == "adult")
             no_of_children = no_of_people - no_of_adults  # Remaining guests are children
             
             # Overwrite fields
@@ -60,50 +120,17 @@ class Reservation(Document):
 @frappe.whitelist()
 def calculate_total_cost(reservation_name):
     """Calculate the total cost of a reservation, including accommodation, activities, and transport."""
-    
-    # Check if the reservation exists
-    if not frappe.db.exists("Reservation", reservation_name):
-        return 0  
-
-    reservation = frappe.get_doc("Reservation", reservation_name)
-    total_cost = 0
-    accommodation_cost = 0
-    has_watersports = False
-
-    # Check if any selected activity belongs to the "Water Sports" category
-    if reservation.activities:
-        for activity in reservation.activities:
-            # Get the category of the activity
-            activity_category = frappe.get_value("Activity", activity.activity_name, "category")
-            if activity_category == "Water Activities":
-                has_watersports = True
-
-    # Calculate accommodation costs
-    if reservation.room_booking:
-        accommodation_cost += sum(room.rate for room in reservation.room_booking)
-
-    if reservation.tent_selection:
-        accommodation_cost += sum(tent.qty * tent.price for tent in reservation.tent_selection)
-
+    return calculate_total_costs([reservation_name]).get(reservation_name, 0)
 
-    if has_watersports:
-        accommodation_cost *= 0.5  # Apply a 50% discount
-
-    # Calculate transport costs
-    if reservation.transport:
-        total_cost += sum(transport.price for transport in reservation.transport)
-
-    total_cost += accommodation_cost
-
-    return total_cost
+@frappe.whitelist()
+def calculate_total_cost_batch(reservation_names):
+    """Price many reservations at once; returns {reservation_name: total_cost}."""
+    return calculate_total_costs(frappe.parse_json(reservation_names))
 
 @frappe.whitelist()
 def create_quotation(reservation_name):
     """Generate a quotation for a reservation."""
     reservation = frappe.get_doc("Reservation", reservation_name)
-    
-    if not reservation.customer_name:
-        frappe.throw("Please ensure the Customer Name field is filled in the Reservation.")
 
     # Check if a quotation already exists and is submitted
     existing_quotation = frappe.get_all("Quotation", filters={"custom_reservation": reservation_name, "docstatus": 1}, fields=["name"])
@@ -111,7 +138,16 @@ def create_quotation(reservation_name):
     if existing_quotation:
         frappe.throw("A quotation has already been created and submitted for this reservation.")
 
-    # Proceed with creating a new quotation
+    quotation = get_quotation_doc(reservation)
+    quotation.insert(ignore_permissions=True)
+
+    return quotation.name
+
+def get_quotation_doc(reservation):
+    """Build (but do not insert) the Quotation for a reservation."""
+    if not reservation.customer_name:
+        frappe.throw("Please ensure the Customer Name field is filled in the Reservation.")
+
     quotation = frappe.get_doc({
         "doctype": "Quotation",
         "customer": reservation.customer_name,
@@ -173,18 +209,93 @@ def create_quotation(reservation_name):
                 "rate": service.price or 0
             })
 
-    
-    quotation.insert(ignore_permissions=True)
-    
 
-    return quotation.name
+    return quotation
+
+@frappe.whitelist()
+def create_quotations(reservation_names=None, filters=None):
+    """Queue quotation generation for a list of reservations or a Reservation filter."""
+    if reservation_names:
+        reservation_names = frappe.parse_json(reservation_names)
+    elif filters:
+        reservation_names = frappe.get_list("Reservation", filters=frappe.parse_json(filters), pluck="name")
+    else:
+        frappe.throw("Please select reservations or provide a filter.")
+
+    if not reservation_names:
+        return {"queued": 0}
+
+    job = frappe.enqueue(
+        "tours_and_safaris.tours_and_safaris.doctype.reservation.reservation.make_quotations",
+        queue="long",
+        timeout=3600,
+        reservation_names=reservation_names,
+        user=frappe.session.user,
+        now=frappe.flags.in_test,
+    )
+
+    return {"queued": len(reservation_names), "job_id": getattr(job, "id", None)}
+
+def make_quotations(reservation_names, chunk_size=50, user=None):
+    """Create quotations for many reservations, committing per chunk and collecting errors.
+
+    Progress and the final summary are sent to `user`, the one who queued the job.
+    """
+    reservation_names = list(dict.fromkeys(reservation_names))
+    user = user or frappe.session.user
+
+    # One query for every reservation that already has a submitted quotation
+    already_quoted = set(frappe.get_all(
+        "Quotation",
+        filters={"custom_reservation": ["in", reservation_names], "docstatus": 1},
+        pluck="custom_reservation",
+    ))
+
+    created, skipped, errors = {}, [], {}
+    total = len(reservation_names)
+
+    for chunk_start in range(0, total, chunk_size):
+        for reservation_name in reservation_names[chunk_start:chunk_start + chunk_size]:
+            if reservation_name in already_quoted:
+                skipped.append(reservation_name)
+                continue
+
+            frappe.db.savepoint("make_quotation")
+            try:
+                quotation = get_quotation_doc(frappe.get_doc("Reservation", reservation_name))
+                quotation.insert(ignore_permissions=True)
+                created[reservation_name] = quotation.name
+            except Exception as e:
+                frappe.db.rollback(save_point="make_quotation")
+                errors[reservation_name] = str(e)
+                frappe.clear_messages()
+
+        frappe.db.commit()
+
+        done = min(chunk_start + chunk_size, total)
+        # What frappe.publish_progress sends, addressed to the calling user
+        frappe.publish_realtime("progress", {
+            "percent": done * 100 / total,
+            "title": "Creating Quotations",
+            "description": f"{done} of {total} reservations processed",
+        }, user=user)
+
+    summary = {"created": created, "skipped": skipped, "errors": errors}
+    if errors:
+        frappe.log_error(
+            title="Bulk quotation errors",
+            message=frappe.as_json(errors, indent=1),
+        )
+    frappe.publish_realtime("bulk_quotations_done", summary, user=user)
+
+    return summary
 
 @frappe.whitelist()
 def update_room_availability(doc, method=None):
     """Update room availability status based on reservation status."""
-    
+
     if not doc.room_booking:
-        return  
+        return
 
     room_status = None
     if doc.status == "Reserved":
@@ -192,33 +303,146 @@ def update_room_availability(doc, method=None):
     elif doc.status == "Confirmed Reservation":
         room_status = "Booked"
 
-    if room_status:
-        for room in doc.room_booking:
-            # Find availability records for the room in the given date range
-            availability_records = frappe.get_all(
-                "Availability",
-                filters={
-                    "room": room.room_number,  
-                    "date": ["between", [doc.arrival_date, doc.depature_date]]
-                },
-                fields=["name"]
-            )
+    if not room_status or not availability_inputs_changed(doc):
+        return
+
+    room_names = list({room.room_name for room in doc.room_booking if room.room_name})
+    if not room_names:
+        return
+
+    # One set-based update for every room and night of this reservation; it is
+    # committed together with the reservation save by the request itself
+    frappe.db.sql("""
+        UPDATE `tabAvailability`
+        SET status = %(status)s, docstatus = 1, modified = %(now)s, modified_by = %(user)s
+        WHERE reservation = %(reservation)s
+            AND room_name IN %(rooms)s
+            AND docstatus < 2
+            AND arrival_date BETWEEN %(arrival_date)s AND %(depature_date)s
+    """, {
+        "status": room_status,
+        "now": now_datetime(),
+        "user": frappe.session.user,
+        "reservation": doc.name,
+        "rooms": room_names,
+        "arrival_date": doc.arrival_date,
+        "depature_date": doc.depature_date,
+    })
+    invalidate_rooms(*room_names)
+
+
+def availability_inputs_changed(doc):
+    """Return True unless status, dates and booked rooms match the previous version."""
+    previous = doc.get_doc_before_save()
+    if not previous:
+        return True
+
+    for fieldname in ("status", "arrival_date", "depature_date"):
+        if doc.has_value_changed(fieldname):
+            return True
+
+    return [room.room_name for room in previous.get("room_booking", [])] != [
+        room.room_name for room in doc.get("room_booking", [])
+    ]
 
-            
-            for record in availability_records:
-                availability_doc = frappe.get_doc("Availability", record.name)
-                availability_doc.status = room_status
-                availability_doc.save()
-                availability_doc.submit()
-                frappe.db.commit()  
 @frappe.whitelist()
 def get_check_in_status(reservation_name):
     """Check if the reservation has been checked in and return its status"""
-    check_in = frappe.db.exists("Check In", {"reservation": reservation_name})
-    check_out = frappe.db.exists("Check Out Log", {"reservation": reservation_name})
-    
-    return {"checked_in": bool(check_in), "checked_out": bool(check_out)}
+    status = get_check_in_statuses([reservation_name])[reservation_name]
+
+    return {"checked_in": status["checked_in"], "checked_out": status["checked_out"]}
 
+@frappe.whitelist()
+def get_check_in_statuses(reservation_names=None, from_date=None, to_date=None):
+    """Check-in/check-out status for many reservations, by name or by stay overlapping a date window.
+
+    Returns {reservation: {"checked_in", "checked_out", "check_in_time", "check_out_time"}}
+    using one grouped query against Check In and one against Check Out Log.
+    """
+    if reservation_names:
+        reservation_names = parse_names(reservation_names)
+        # Only the reservations the user may read, as in the date window mode
+        reservation_names = frappe.get_list(
+            "Reservation",
+            filters={"name": ["in", reservation_names]},
+            pluck="name",
+            limit=len(reservation_names),
+        ) if reservation_names else []
+    elif from_date and to_date:
+        reservation_names = frappe.get_list("Reservation", filters=[
+            ["arrival_date", "<", add_days(getdate(to_date), 1)],
+            ["depature_date", ">=", getdate(from_date)],
+        ], pluck="name", limit=0)
+    else:
+        frappe.throw("Please provide reservation names or a date window.")
+
+    statuses = {
+        name: {"checked_in": False, "checked_out": False, "check_in_time": None, "check_out_time": None}
+        for name in reservation_names
+    }
+    if not statuses:
+        return statuses
+
+    for doctype, time_field, flag, key in (
+        ("Check In", "check_in_time", "checked_in", "check_in_time"),
+        ("Check Out Log", "check_out_datetime", "checked_out", "check_out_time"),
+    ):
+        for reservation, last_time in frappe.db.sql(f"""
+            SELECT reservation, MAX(`{time_field}`)
+            FROM `tab{doctype}`
+            WHERE reservation IN %(names)s
+            GROUP BY reservation
+        """, {"names": list(statuses)}):
+            statuses[reservation][flag] = True
+            statuses[reservation][key] = last_time
+
+    return statuses
+
+@frappe.whitelist()
+def get_form_bootstrap(reservation_name):
+    """Everything the Reservation form needs on refresh, in one read-only call.
+
+    Total cost and the quotation flag are cached against the reservation's
+    `modified` timestamp. Check-in/out status and availability are read live:
+    submitting a Check In or Check Out Log does not touch the reservation.
+    """
+    frappe.has_permission("Reservation", "read", reservation_name, throw=True)
+
+    modified = frappe.db.get_value("Reservation", reservation_name, "modified")
+    if not modified:
+        return {}
+
+    cache = frappe.cache()
+    cached = cache.hget(FORM_BOOTSTRAP_CACHE_KEY, reservation_name)
+    if not cached or cached["modified"] != modified:
+        cached = {
+            "modified": modified,
+            "data": {
+                "total_cost": calculate_total_cost(reservation_name),
+                "quotation_exists": bool(frappe.db.exists(
+                    "Quotation", {"custom_reservation": reservation_name, "docstatus": 1}
+                )),
+            },
+        }
+        cache.hset(FORM_BOOTSTRAP_CACHE_KEY, reservation_name, cached)
+
+    availability_status = dict(frappe.db.sql("""
+        SELECT status, COUNT(*)
+        FROM `tabAvailability`
+        WHERE reservation = %s AND docstatus < 2
+        GROUP BY status
+    """, (reservation_name,)))
+
+    return {
+        **cached["data"],
+        **get_check_in_status(reservation_name),
+        "availability_status": availability_status,
+    }
+
+def clear_form_bootstrap_cache(doc, method=None):
+    """Drop cached form data for the reservation a Quotation belongs to."""
+    if doc.get("custom_reservation"):
+        frappe.cache().hdel(FORM_BOOTSTRAP_CACHE_KEY, doc.custom_reservation)
 
 @frappe.whitelist()
 def create_check_in(reservation_name):
@@ -248,34 +472,26 @@ def create_check_in(reservation_name):
 
 @frappe.whitelist()
 def create_check_out(reservation_name):
-    """Handles check-out process and triggers maintenance logs."""
+    """Handles check-out process; housekeeping (maintenance logs, room status) runs in the background."""
     reservation = frappe.get_doc("Reservation", reservation_name)
     
     check_out = frappe.get_doc({
         "doctype": "Check Out Log",
         "reservation": reservation.name,
         "customer_name": reservation.customer_name,
-        "check_out_time": now_datetime(),
+        "check_out_datetime": now_datetime(),
        # "room_details": reservation.room_booking
     })
     
     check_out.insert()
     check_out.submit()
 
-    # Create Maintenance Logs
-    for room in reservation.room_booking:
-        maintenance_log = frappe.get_doc({
-            "doctype": "Maintenance Log",
-            "room_name": room.room_name,
-            "maintenance_date": now_datetime(),
-            "description": "Routine cleaning after check-out",
-            "status": "Pending"
-        })
-        maintenance_log.insert()
-
     # Mark reservation as checked out
     reservation.checked_out = 1
     reservation.save()
+
+    # Queued after commit, so the job sees the checked-out reservation
+    enqueue_checkout_housekeeping(reservation.name)
     frappe.db.commit()
     
     return check_out.name
@@ -283,57 +499,68 @@ def create_check_out(reservation_name):
 @frappe.whitelist()
 def get_available_rooms(arrival_date, depature_date, room_type=None):
     """Fetch rooms that are NOT booked for the selected date range."""
-    arrival_date, depature_date = getdate(arrival_date), getdate(depature_date)
-
-    # Get all booked rooms for the selected period
-    booked_rooms = frappe.get_all(
-        "Availability",
-        filters={
-            "status": "Booked",
-            "arrival_date": ["<=", depature_date],
-            "depature_date": [">=", arrival_date]
-        },
-        fields=["room_name"]
-    )
-
-    booked_room_names = {room["room_name"] for room in booked_rooms}
-
-    # Fetch all available rooms of the given type
-    filters = {"status": "Available"}
-    if room_type:
-        filters["room_type"] = room_type
-
-    available_rooms = frappe.get_all("Rooms", filters=filters, fields=["room_number", "capacity", "base_price"])
-
-    return [room for room in available_rooms if room["room_number"] not in booked_room_names]
+    return get_free_rooms(arrival_date, depature_date, room_type)
 
 
 @frappe.whitelist()
 def add_room_to_calendar(reservation_name, room_name, arrival_date, depature_date):
     """Adds a room to the availability calendar as Reserved."""
-    reservation = frappe.get_doc("Reservation", reservation_name)
+    add_rooms_to_calendar(reservation_name, [room_name], arrival_date, depature_date)
 
-    for date in frappe.utils.date_range(arrival_date, depature_date):
-        availability = frappe.get_doc({
-            "doctype": "Availability",
-            "room": room_name,
-            "date": date,
-            "status": "Reserved",
-            "reservation": reservation_name
-        })
-        availability.insert()
+@frappe.whitelist()
+def add_rooms_to_calendar(reservation_name, room_names, arrival_date, depature_date):
+    """Adds one or more rooms to the availability calendar as Reserved, one row per night."""
+    result = reserve_rooms(reservation_name, room_names, arrival_date, depature_date)
+    if not result["reserved"]:
+        frappe.throw(format_room_conflicts(result["conflicts"]), RoomConflictError, title="Rooms not available")
+
+@frappe.whitelist()
+def reserve_rooms(reservation_name, room_names, arrival_date, depature_date):
+    """Atomically hold rooms for a date range: either every room is reserved or none is.
+
+    The rooms are locked for the duration of the check and insert, so two agents
+    cannot both reserve the same room for overlapping dates. Returns
+    {"reserved": True, "rooms": [...]} or {"reserved": False, "conflicts": [...]}.
+    """
+    room_names = parse_names(room_names)
+    if not room_names:
+        return {"reserved": True, "rooms": []}
+
+    conflicts = lock_and_check_rooms(room_names, arrival_date, depature_date, reservation_name)
+    if conflicts:
+        # Releases the room locks
+        frappe.db.rollback()
+        return {"reserved": False, "conflicts": conflicts}
+
+    # Re-ticking a room replaces its nights instead of duplicating them
+    delete_availability(reservation_name, room_names)
+    bulk_insert_availability(get_nightly_rows(reservation_name, room_names, arrival_date, depature_date))
 
     frappe.db.commit()
 
+    return {"reserved": True, "rooms": room_names}
+
 @frappe.whitelist()
 def remove_room_from_calendar(reservation_name, room_name):
     """Removes a room from the availability calendar when unselected."""
-    frappe.db.delete("Availability", {
-        "reservation": reservation_name,
-        "room": room_name
-    })
+    remove_rooms_from_calendar(reservation_name, [room_name])
+
+@frappe.whitelist()
+def remove_rooms_from_calendar(reservation_name, room_names):
+    """Removes one or more rooms from the availability calendar in one statement."""
+    room_names = parse_names(room_names)
+    if not room_names:
+        return
+
+    delete_availability(reservation_name, room_names)
     frappe.db.commit()
 
+def parse_names(names):
+    """Accept a list, a JSON list or a single name from the client."""
+    if isinstance(names, str):
+        names = frappe.parse_json(names) if names.startswith("[") else [names]
+    return list(dict.fromkeys(name for name in names or [] if name))
+
 @frappe.whitelist()
 def confirm_room_reservations(reservation_name):
     """Marks reserved rooms as Confirmed Reservation when the reservation is confirmed."""
@@ -342,6 +569,7 @@ def confirm_room_reservations(reservation_name):
         SET status = 'Confirmed Reservation'
         WHERE reservation = %s
     """, (reservation_name,))
+    invalidate_reservation_rooms(reservation_name)
 
     frappe.db.commit()
 
@@ -387,27 +615,20 @@ def update_availability_status():
 @frappe.whitelist()
 def complete_maintenance(maintenance_log_name):
     """Marks maintenance as completed and makes the room available."""
-    maintenance_log = frappe.get_doc("Maintenance Log", maintenance_log_name)
+    # Locked so two cleaners cannot complete the same log
+    maintenance_log = frappe.get_doc("Maintenance Log", maintenance_log_name, for_update=True)
     
-    if maintenance_log.status != "Pending":
-        frappe.throw("Maintenance log must be in Pending status to complete.")
+    if maintenance_log.status not in ("Pending", "On-going"):
+        frappe.throw("Maintenance log must be Pending or On-going to complete.")
 
     maintenance_log.status = "Completed"
     maintenance_log.submit()
 
     # Update room status to Available
-    frappe.db.set_value("Rooms", maintenance_log.room_name, "status", "Available")
-
-    # Check if all rooms in the reservation are cleaned
-    reservation = frappe.get_doc("Reservation", maintenance_log.reservation)
-    all_rooms_cleaned = all(
-        frappe.db.get_value("Rooms", room.room_name, "status") == "Available"
-        for room in reservation.room_booking
-    )
+    frappe.db.set_value("Rooms", maintenance_log.room, "status", "Available")
 
-    if all_rooms_cleaned:
-        reservation.status = "Completed"
-        reservation.save()
+    # Complete the reservation once none of its maintenance logs is outstanding
+    complete_cleaned_reservations([maintenance_log.reservation])
     
     frappe.db.commit()
 
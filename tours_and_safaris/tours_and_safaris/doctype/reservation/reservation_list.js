@@ -1,10 +1,34 @@
 frappe.listview_settings['Reservation'] = {
     onload: function (listview) {
+        frappe.listview_settings['Reservation'].check_in_statuses = {};
         listview.page.add_inner_button(__('📅 Calendar View'), function () {
             window.location.href = "/app/reservation/view/calendar/Reservations";
         });
     },
 
+    // Check-in/check-out state for the rows on screen, refetched in one call on every refresh
+    // since checking in or out does not change the Reservation itself
+    check_in_statuses: {},
+
+    refresh: function (listview) {
+        let settings = frappe.listview_settings['Reservation'];
+        let names = (listview.data || []).map(doc => doc.name);
+
+        if (!names.length) {
+            settings.check_in_statuses = {};
+            return;
+        }
+
+        frappe.call({
+            method: "tours_and_safaris.tours_and_safaris.doctype.reservation.reservation.get_check_in_statuses",
+            args: { reservation_names: names },
+            callback: function (response) {
+                settings.check_in_statuses = response.message || {};
+                listview.render_list();
+            }
+        });
+    },
+
     formatters: {
         calendar_icon: function (value, df, doc) {
             return `<a href="/app/reservation/view/calendar/Reservations" title="View in Calendar">
@@ -16,6 +40,16 @@ frappe.listview_settings['Reservation'] = {
     add_fields: ["status", "arrival_date", "depature_date"],
 
     get_indicator: function (doc) {
+        let check_in = frappe.listview_settings['Reservation'].check_in_statuses[doc.name];
+        if (check_in && check_in.checked_out) {
+            return [__("Departed"), "gray", "checked_out,=,1"];
+        } else if (check_in && check_in.checked_in) {
+            if (frappe.datetime.get_date(check_in.check_in_time) === frappe.datetime.get_today()) {
+                return [__("Arrived"), "blue", "checked_in,=,1"];
+            }
+            return [__("In House"), "purple", "checked_in,=,1"];
+        }
+
         if (doc.status === "Confirmed Reservation") {
             return [__("Confirmed"), "green", "status,=,Confirmed Reservation"];
         } else if (doc.status === "Pending") {
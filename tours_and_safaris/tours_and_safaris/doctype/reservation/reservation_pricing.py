@@ -0,0 +1,114 @@
+# Copyright (c) 2025, wanguimbutu and contributors
+# For license information, please see license.txt
+
+"""Reservation pricing with a cached catalog.
+
+Rows are priced from their own rate or price; the catalog maps activities to
+their category, which decides the watersports discount. Each catalog is
+loaded with one query the first time it is needed and dropped from the cache
+when a document of that type changes (see `doc_events` in hooks.py).
+"""
+
+import frappe
+from frappe.utils import flt
+
+CATALOG_CACHE_KEY = "tours_and_safaris:pricing_catalog"
+# Reservation form data that includes a priced total, see reservation.get_form_bootstrap
+FORM_BOOTSTRAP_CACHE_KEY = "tours_and_safaris:reservation_form_bootstrap"
+
+# catalog name -> (doctype, value field)
+CATALOGS = {
+    "activity_category": ("Activity Type", "custom_category"),
+}
+
+WATERSPORTS_CATEGORY = "Water Activities"
+WATERSPORTS_ACCOMMODATION_DISCOUNT = 0.5
+
+# Reservation child tables used for pricing: fieldname -> (child doctype, fields)
+PRICED_TABLES = {
+    "activities": ("Activity Package", ["activity_name"]),
+    "room_booking": ("Inquiry Room Booking", ["rate"]),
+    "tent_selection": ("Tent Selection", ["qty", "price"]),
+    "transport": ("Transport", ["price"]),
+}
+
+
+def get_catalog(catalog):
+    """Return {name: value} for one catalog, loading it with a single query on a cache miss."""
+    doctype, fieldname = CATALOGS[catalog]
+
+    def load():
+        return dict(frappe.get_all(doctype, fields=["name", fieldname], as_list=True))
+
+    return frappe.cache().hget(CATALOG_CACHE_KEY, catalog, generator=load)
+
+
+def clear_catalog_cache(doc, method=None):
+    """Drop the catalogs built from this document's doctype."""
+    for catalog, (doctype, _fieldname) in CATALOGS.items():
+        if doctype == doc.doctype:
+            frappe.cache().hdel(CATALOG_CACHE_KEY, catalog)
+
+    # Cached reservation totals were priced with the old catalog
+    frappe.cache().delete_value(FORM_BOOTSTRAP_CACHE_KEY)
+
+
+def price_reservation(rows):
+    """Total cost for one reservation from its priced child rows ({table: [rows]})."""
+    activity_category = get_catalog("activity_category") if rows.get("activities") else {}
+
+    has_watersports = any(
+        activity_category.get(activity.activity_name) == WATERSPORTS_CATEGORY
+        for activity in rows.get("activities", [])
+    )
+
+    accommodation_cost = sum(flt(room.rate) for room in rows.get("room_booking", []))
+    accommodation_cost += sum(flt(tent.qty) * flt(tent.price) for tent in rows.get("tent_selection", []))
+
+    if has_watersports:
+        accommodation_cost *= WATERSPORTS_ACCOMMODATION_DISCOUNT
+
+    transport_cost = sum(flt(transport.price) for transport in rows.get("transport", []))
+
+    return transport_cost + accommodation_cost
+
+
+def get_priced_rows(reservation_names):
+    """Fetch the priced child rows of many reservations, one query per child table."""
+    rows = {name: {table: [] for table in PRICED_TABLES} for name in reservation_names}
+
+    for table, (child_doctype, fields) in PRICED_TABLES.items():
+        for row in frappe.get_all(
+            child_doctype,
+            filters={
+                "parenttype": "Reservation",
+                "parentfield": table,
+                "parent": ["in", reservation_names],
+            },
+            fields=["parent", *fields],
+            order_by="idx asc",
+        ):
+            rows[row.parent][table].append(row)
+
+    return rows
+
+
+def calculate_total_costs(reservation_names):
+    """Return {reservation_name: total_cost} for every reservation in the list the user may read."""
+    reservation_names = list(reservation_names)
+    if not reservation_names:
+        return {}
+
+    reservation_names = frappe.get_list(
+        "Reservation",
+        filters={"name": ["in", reservation_names]},
+        pluck="name",
+        limit=len(reservation_names),
+    )
+    if not reservation_names:
+        return {}
+
+    return {
+        name: price_reservation(rows)
+        for name, rows in get_priced_rows(reservation_names).items()
+    }
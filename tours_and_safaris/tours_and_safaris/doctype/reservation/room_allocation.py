@@ -0,0 +1,174 @@
+# Copyright (c) 2025, wanguimbutu and contributors
+# For license information, please see license.txt
+
+"""Allocate free rooms and tents to a group.
+
+Choosing which units cover a party at the lowest cost (or with the fewest
+units) is a covering knapsack. Identical units are grouped by capacity and
+price and split into power-of-two bundles, then a dynamic programme over the
+covered head count (capped at the party size) picks the bundles. Run time is
+about O(bundles x party size), so a few hundred rooms plan in milliseconds.
+"""
+
+import frappe
+from frappe.utils import cint, date_diff, flt, getdate
+
+from tours_and_safaris.tours_and_safaris.doctype.availability.availability import HOLDING_STATUSES
+from tours_and_safaris.tours_and_safaris.doctype.availability.availability_index import get_free_rooms
+from tours_and_safaris.tours_and_safaris.doctype.tents.tents import get_remaining_tents
+
+OBJECTIVES = ("cheapest", "fewest_rooms")
+UNLIMITED_TENTS = 10**6
+
+
+def split_into_bundles(units, party_size):
+    """Group identical units and split each group into power-of-two bundles.
+
+    `units` are dicts with kind, key, capacity, price and either `names` (rooms)
+    or `count` (tents). Units of a group beyond what the party could fill are
+    dropped. Returns bundles as (group, qty, capacity, price).
+    """
+    groups = {}
+    for unit in units:
+        capacity = cint(unit["capacity"])
+        if capacity <= 0:
+            continue
+        group_key = (unit["kind"], unit.get("key"), capacity, flt(unit["price"]))
+        group = groups.setdefault(group_key, {**unit, "capacity": capacity, "names": [], "count": 0})
+        group["names"].extend(unit.get("names") or [])
+        group["count"] += cint(unit.get("count") or len(unit.get("names") or []))
+
+    bundles = []
+    for group in groups.values():
+        remaining, size = min(group["count"], -(-party_size // group["capacity"])), 1
+        while remaining > 0:
+            qty = min(size, remaining)
+            bundles.append((group, qty, group["capacity"] * qty, flt(group["price"]) * qty))
+            remaining -= qty
+            size *= 2
+
+    return bundles
+
+
+def plan_allocation(units, party_size, objective="cheapest"):
+    """Pick units whose capacity covers `party_size`, minimising cost or unit count.
+
+    Returns {"units": [(group, qty)], "capacity", "price", "count"} or None if the
+    units cannot hold the party.
+    """
+    party_size = cint(party_size)
+    if party_size <= 0:
+        return {"units": [], "capacity": 0, "price": 0, "count": 0}
+
+    bundles = split_into_bundles(units, party_size)
+
+    # best[c] = (primary, secondary) cost of covering at least c people
+    fewest = objective == "fewest_rooms"
+    best = [None] * (party_size + 1)
+    best[0] = (0, 0)
+    took = []
+
+    for _group, qty, capacity, price in bundles:
+        cost = (qty, price) if fewest else (price, qty)
+        step = {}
+        for covered in range(party_size, -1, -1):
+            if best[covered] is None:
+                continue
+            target = min(party_size, covered + capacity)
+            candidate = (best[covered][0] + cost[0], best[covered][1] + cost[1])
+            if best[target] is None or candidate < best[target]:
+                best[target] = candidate
+                step[target] = covered
+        took.append(step)
+
+    if best[party_size] is None:
+        return None
+
+    chosen, covered = [], party_size
+    for index in range(len(bundles) - 1, -1, -1):
+        if covered in took[index]:
+            chosen.append(bundles[index])
+            covered = took[index][covered]
+
+    # Merge the bundles taken from the same group
+    picked = []
+    for group, qty, _capacity, _price in chosen:
+        for index, (picked_group, picked_qty) in enumerate(picked):
+            if picked_group is group:
+                picked[index] = (group, picked_qty + qty)
+                break
+        else:
+            picked.append((group, qty))
+
+    return {
+        "units": picked,
+        "capacity": sum(capacity for _group, _qty, capacity, _price in chosen),
+        "price": sum(price for _group, _qty, _capacity, price in chosen),
+        "count": sum(qty for _group, qty, _capacity, _price in chosen),
+    }
+
+
+def get_tent_units(arrival_date, depature_date):
+    """Tent types as allocation units, limited to the fewest tents left on any night of the stay."""
+    start_date = getdate(arrival_date)
+    days = max(date_diff(getdate(depature_date), start_date), 1)
+    remaining = get_remaining_tents(start_date, days)
+
+    units = []
+    for tent in frappe.get_all("Tents", fields=["name", "capacity", "rate"]):
+        nightly = remaining.get(tent.name)
+        # Untracked stock is effectively unlimited; split_into_bundles caps it at the party size
+        count = UNLIMITED_TENTS if nightly is None else max(min(nightly), 0)
+        if count:
+            units.append({"kind": "Tent", "key": tent.name, "capacity": tent.capacity, "price": tent.rate, "count": count})
+
+    return units
+
+
+@frappe.whitelist()
+def suggest_allocation(arrival_date, depature_date, adults, children=0, room_type=None,
+        objective="cheapest", include_tents=1):
+    """Cheapest (or fewest-unit) combination of free rooms and tents that fits the group."""
+    if objective not in OBJECTIVES:
+        frappe.throw(f"Objective must be one of {', '.join(OBJECTIVES)}.")
+
+    party_size = cint(adults) + cint(children)
+    nights = max(date_diff(getdate(depature_date), getdate(arrival_date)), 1)
+
+    units = [
+        {"kind": "Room", "capacity": room.capacity,
+            "price": room.base_price, "names": [room.room_number]}
+        for room in get_free_rooms(arrival_date, depature_date, room_type, HOLDING_STATUSES)
+    ]
+    if cint(include_tents):
+        units += get_tent_units(arrival_date, depature_date)
+
+    plan = plan_allocation(units, party_size, objective)
+    if plan is None:
+        return {
+            "feasible": False,
+            "party_size": party_size,
+            "available_capacity": sum(cint(unit["capacity"]) * cint(unit.get("count") or 1) for unit in units),
+        }
+
+    rooms, tents = [], []
+    for group, qty in plan["units"]:
+        if group["kind"] == "Room":
+            rooms += [
+                {"room_name": name, "capacity": cint(group["capacity"]), "rate": flt(group["price"])}
+                for name in group["names"][:qty]
+            ]
+        else:
+            tents.append({"tent_type": group["key"], "qty": qty, "price": flt(group["price"])})
+
+    return {
+        "feasible": True,
+        "party_size": party_size,
+        "objective": objective,
+        "rooms": rooms,
+        "tents": tents,
+        "capacity": plan["capacity"],
+        "units": plan["count"],
+        "nightly_cost": plan["price"],
+        "total_cost": plan["price"] * nights,
+    }
@@ -1,9 +1,38 @@
 # Copyright (c) 2025, wanguimbutu and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from tours_and_safaris.tours_and_safaris.doctype.reservation.reservation_pricing import price_reservation
+from tours_and_safaris.tours_and_safaris.doctype.reservation.room_allocation import plan_allocation
+
 
 class TestReservation(FrappeTestCase):
-	pass
+	def test_plan_allocation_objectives(self):
+		units = [
+			{"kind": "Room", "capacity": 4, "price": 300, "names": ["FAMILY-1"]},
+			{"kind": "Room", "capacity": 2, "price": 100, "names": ["DOUBLE-1"]},
+			{"kind": "Room", "capacity": 2, "price": 100, "names": ["DOUBLE-2"]},
+			{"kind": "Room", "capacity": 1, "price": 40, "names": ["SINGLE-1"]},
+		]
+
+		cheapest = plan_allocation(units, 4, "cheapest")
+		self.assertEqual(cheapest["price"], 200)
+		self.assertEqual(cheapest["count"], 2)
+
+		fewest = plan_allocation(units, 4, "fewest_rooms")
+		self.assertEqual(fewest["count"], 1)
+		self.assertEqual(fewest["price"], 300)
+
+		self.assertIsNone(plan_allocation(units, 10))
+
+	def test_price_reservation_keeps_zero_rates(self):
+		rows = {
+			"room_booking": [frappe._dict(rate=0), frappe._dict(rate=100)],
+			"tent_selection": [frappe._dict(qty=2, price=50)],
+			"transport": [frappe._dict(price=30), frappe._dict(price=None)],
+		}
+
+		# A complimentary room stays free
+		self.assertEqual(price_reservation(rows), 230)
@@ -1,9 +1,143 @@
 # Copyright (c) 2025, wanguimbutu and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
+from frappe.utils import add_days, cint, date_diff, getdate
+
+MAX_MATRIX_DAYS = 90
 
 
 class Tents(Document):
 	pass
+
+
+class TentStockError(frappe.ValidationError):
+	pass
+
+
+def get_night_span(arrival_date, depature_date, start_date, days):
+	"""(first, last) night offsets a stay covers inside a `days` window; a same-day stay covers one night."""
+	first = date_diff(getdate(arrival_date), start_date)
+	last = max(date_diff(getdate(depature_date), start_date), first + 1)
+
+	return max(first, 0), min(last, days)
+
+
+def get_committed_tents(start_date, days, tent_types=None, exclude_reservation=None):
+	"""Return {tent_type: [qty committed per night]} for `days` nights from `start_date`.
+
+	Built from one query over submitted reservations, with a difference array
+	per tent type turned into nightly totals by a prefix sum.
+	"""
+	start_date = getdate(start_date)
+	conditions = ""
+	if tent_types:
+		conditions += " AND selection.tent_type IN %(tent_types)s"
+	if exclude_reservation:
+		conditions += " AND reservation.name != %(exclude_reservation)s"
+
+	rows = frappe.db.sql(f"""
+		SELECT selection.tent_type, selection.qty, reservation.arrival_date, reservation.depature_date
+		FROM `tabTent Selection` selection
+		JOIN `tabReservation` reservation
+			ON reservation.name = selection.parent
+			AND selection.parenttype = 'Reservation'
+			AND selection.parentfield = 'tent_selection'
+		WHERE reservation.docstatus = 1
+			AND reservation.arrival_date < %(end_date)s
+			AND reservation.depature_date >= %(start_date)s
+			{conditions}
+	""", {
+		"start_date": start_date,
+		"end_date": add_days(start_date, days),
+		"tent_types": list(tent_types or []),
+		"exclude_reservation": exclude_reservation,
+	}, as_dict=True)
+
+	changes = {}
+	for row in rows:
+		first, last = get_night_span(row.arrival_date, row.depature_date, start_date, days)
+		if first >= last or not row.tent_type:
+			continue
+		diff = changes.setdefault(row.tent_type, [0] * (days + 1))
+		diff[first] += cint(row.qty)
+		diff[last] -= cint(row.qty)
+
+	committed = {}
+	for tent_type, diff in changes.items():
+		running, nightly = 0, []
+		for change in diff[:days]:
+			running += change
+			nightly.append(running)
+		committed[tent_type] = nightly
+
+	return committed
+
+
+def get_remaining_tents(start_date, days, tent_types=None, exclude_reservation=None, for_update=False):
+	"""Return {tent_type: [remaining per night]}; types without stock tracking map to None."""
+	filters = {"name": ["in", list(tent_types)]} if tent_types else {}
+	if for_update:
+		# Serialise concurrent submits booking the same tent types
+		stock = dict(frappe.db.sql("""
+			SELECT name, stock_qty FROM `tabTents`
+			WHERE name IN %(names)s
+			ORDER BY name
+			FOR UPDATE
+		""", {"names": list(tent_types)}))
+	else:
+		stock = dict(frappe.get_all("Tents", filters=filters, fields=["name", "stock_qty"], as_list=True))
+
+	committed = get_committed_tents(start_date, days, list(stock), exclude_reservation)
+
+	return {
+		tent_type: None if not cint(stock_qty) else [
+			cint(stock_qty) - used for used in committed.get(tent_type, [0] * days)
+		]
+		for tent_type, stock_qty in stock.items()
+	}
+
+
+def ensure_tents_available(reservation):
+	"""Throw TentStockError if submitting `reservation` would overbook any tent type on any night."""
+	requested = {}
+	for tent in reservation.get("tent_selection", []):
+		if tent.tent_type:
+			requested[tent.tent_type] = requested.get(tent.tent_type, 0) + cint(tent.qty)
+	if not requested:
+		return
+
+	start_date = getdate(reservation.arrival_date)
+	days = max(date_diff(getdate(reservation.depature_date), start_date), 1)
+	remaining = get_remaining_tents(start_date, days, requested, reservation.name, for_update=True)
+
+	shortages = []
+	for tent_type, qty in requested.items():
+		nightly = remaining.get(tent_type)
+		if nightly is None:
+			continue
+		for night, left in enumerate(nightly):
+			if qty > left:
+				shortages.append(f"{tent_type} on {add_days(start_date, night)}: {max(left, 0)} left, {qty} requested")
+
+	if shortages:
+		frappe.throw("<br>".join(shortages), TentStockError, title="Not enough tents")
+
+
+@frappe.whitelist()
+def get_tent_availability_matrix(start_date, days=30, tent_type=None):
+	"""Tent types x nights grid of remaining quantity for planners (None where stock is untracked)."""
+	start_date, days = getdate(start_date), cint(days)
+	if not 0 < days <= MAX_MATRIX_DAYS:
+		frappe.throw(f"Days must be between 1 and {MAX_MATRIX_DAYS}.")
+
+	remaining = get_remaining_tents(start_date, days, [tent_type] if tent_type else None)
+	tent_types = sorted(remaining)
+
+	return {
+		"start_date": start_date,
+		"days": days,
+		"tent_types": tent_types,
+		"remaining": [remaining[tent_type] for tent_type in tent_types],
+	}
@@ -0,0 +1,58 @@
+# Copyright (c) 2025, wanguimbutu and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import getdate
+
+from tours_and_safaris.tours_and_safaris.doctype.vehicle_allocation.vehicle_allocation import (
+	VEHICLE_ALLOCATION_BULK_FIELDS,
+	get_free_vehicles,
+	get_vehicle_conflicts,
+)
+from tours_and_safaris.utils import bulk_insert_docs
+
+
+class TestVehicleAllocation(FrappeTestCase):
+	def setUp(self):
+		for vehicle in ("_Test VA Truck", "_Test VA Van"):
+			if not frappe.db.exists("Vehicle", vehicle):
+				frappe.get_doc({"doctype": "Vehicle", "name": vehicle}).db_insert()
+
+		# Hooks are skipped: only the reservation's docstatus matters here
+		for name, docstatus in (("_Test VA Submitted", 1), ("_Test VA Draft", 0)):
+			frappe.db.delete("Reservation", {"name": name})
+			frappe.get_doc({"doctype": "Reservation", "name": name, "docstatus": docstatus}).db_insert()
+
+		frappe.db.delete("Vehicle Allocation", {"vehicle": ["in", ["_Test VA Truck", "_Test VA Van"]]})
+		bulk_insert_docs("Vehicle Allocation", VEHICLE_ALLOCATION_BULK_FIELDS, [
+			{"vehicle": "_Test VA Truck", "allocation_date": "2025-06-02", "reservation": "_Test VA Submitted", "source": "Transport"},
+			{"vehicle": "_Test VA Van", "allocation_date": "2025-06-02", "reservation": "_Test VA Draft", "source": "Transport"},
+		])
+
+	def allocation(self, vehicle, allocation_date):
+		return frappe._dict(vehicle=vehicle, allocation_date=getdate(allocation_date), source="Transport")
+
+	def test_conflicts_come_from_submitted_reservations(self):
+		conflicts = get_vehicle_conflicts([
+			self.allocation("_Test VA Truck", "2025-06-02"),
+			self.allocation("_Test VA Truck", "2025-06-03"),
+			self.allocation("_Test VA Van", "2025-06-02"),
+		], "_Test VA New")
+
+		self.assertEqual(
+			[(row.vehicle, getdate(row.allocation_date), row.reservation) for row in conflicts],
+			[("_Test VA Truck", getdate("2025-06-02"), "_Test VA Submitted")],
+		)
+
+	def test_own_allocations_are_not_conflicts(self):
+		self.assertEqual(
+			get_vehicle_conflicts([self.allocation("_Test VA Truck", "2025-06-02")], "_Test VA Submitted"), []
+		)
+
+	def test_free_vehicles_ignore_drafts(self):
+		free = get_free_vehicles("2025-06-01", "2025-06-02")
+		self.assertNotIn("_Test VA Truck", free)
+		self.assertIn("_Test VA Van", free)
+
+		self.assertIn("_Test VA Truck", get_free_vehicles("2025-06-03", "2025-06-05"))
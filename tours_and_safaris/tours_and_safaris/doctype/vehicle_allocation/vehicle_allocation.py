@@ -0,0 +1,177 @@
+# Copyright (c) 2025, wanguimbutu and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_days, cint, date_diff, getdate
+
+from tours_and_safaris.utils import bulk_insert_docs
+
+VEHICLE_ALLOCATION_BULK_FIELDS = ("vehicle", "allocation_date", "reservation", "source")
+
+# Only submitted reservations hold a vehicle; rows left by drafts indexed before are ignored
+SUBMITTED_RESERVATION_JOIN = (
+	"JOIN `tabReservation` reservation ON reservation.name = allocation.reservation AND reservation.docstatus = 1"
+)
+
+
+class VehicleAllocation(Document):
+	pass
+
+
+class VehicleConflictError(frappe.ValidationError):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Vehicle Allocation", ["vehicle", "allocation_date"])
+
+
+def get_reservation_allocations(reservation):
+	"""Vehicle-days a reservation uses: [{vehicle, allocation_date, source}].
+
+	Safari itinerary rows pin a vehicle to their day. Transport rows that no
+	itinerary day refers to hold their vehicle for every day of the stay.
+	"""
+	transport_rows = reservation.get("transport", [])
+	safari_rows = [row for row in reservation.get("safari_reservation", []) if row.day and row.transport]
+
+	# Vehicles of the Transport Services in use, when the row itself has none
+	service_names = {row.transport_name for row in transport_rows if row.transport_name}
+	service_names |= {row.transport for row in safari_rows}
+	service_vehicles = dict(frappe.get_all(
+		"Transport Service",
+		filters={"name": ["in", list(service_names)]},
+		fields=["name", "vehicle_name"],
+		as_list=True,
+	)) if service_names else {}
+
+	row_vehicles = {
+		row.name: row.vehicle_name or service_vehicles.get(row.transport_name)
+		for row in transport_rows
+	}
+
+	allocations = {}
+	used_on_safari = set()
+	for row in safari_rows:
+		# The itinerary may point at one of this reservation's transport rows or at a service
+		vehicle = row_vehicles.get(row.transport) or service_vehicles.get(row.transport)
+		if vehicle:
+			allocations[(vehicle, getdate(row.day))] = "Safari"
+			used_on_safari.add(row.transport)
+
+	if reservation.arrival_date and reservation.depature_date:
+		start_date = getdate(reservation.arrival_date)
+		days = max(date_diff(getdate(reservation.depature_date), start_date), 0) + 1
+		for row in transport_rows:
+			vehicle = row_vehicles.get(row.name)
+			if not vehicle or row.name in used_on_safari or row.transport_name in used_on_safari:
+				continue
+			for day in range(days):
+				allocations.setdefault((vehicle, add_days(start_date, day)), "Transport")
+
+	return [
+		frappe._dict(vehicle=vehicle, allocation_date=allocation_date, source=source)
+		for (vehicle, allocation_date), source in allocations.items()
+	]
+
+
+def get_vehicle_conflicts(allocations, reservation_name=None):
+	"""Allocations of other submitted reservations on the same vehicle and day, from one indexed query."""
+	if not allocations:
+		return []
+
+	vehicles = list({allocation.vehicle for allocation in allocations})
+	dates = [allocation.allocation_date for allocation in allocations]
+	wanted = {(allocation.vehicle, getdate(allocation.allocation_date)) for allocation in allocations}
+
+	rows = frappe.db.sql(f"""
+		SELECT allocation.vehicle, allocation.allocation_date, allocation.reservation
+		FROM `tabVehicle Allocation` allocation
+		{SUBMITTED_RESERVATION_JOIN}
+		WHERE allocation.vehicle IN %(vehicles)s
+			AND allocation.allocation_date BETWEEN %(from_date)s AND %(to_date)s
+			AND allocation.reservation != %(reservation)s
+		ORDER BY allocation.allocation_date, allocation.vehicle
+	""", {
+		"vehicles": vehicles,
+		"from_date": min(dates),
+		"to_date": max(dates),
+		"reservation": reservation_name or "",
+	}, as_dict=True)
+
+	return [row for row in rows if (row.vehicle, getdate(row.allocation_date)) in wanted]
+
+
+def validate_vehicle_allocations(reservation):
+	"""Throw VehicleConflictError if the reservation's vehicles are already taken on any of its days."""
+	conflicts = get_vehicle_conflicts(get_reservation_allocations(reservation), reservation.name)
+	if conflicts:
+		frappe.throw(
+			"<br>".join(
+				f"Vehicle {conflict.vehicle} is already assigned to {conflict.reservation} on {conflict.allocation_date}"
+				for conflict in conflicts
+			),
+			VehicleConflictError,
+			title="Vehicle double-booked",
+		)
+
+
+def sync_vehicle_allocations(reservation):
+	"""Replace the reservation's rows in the vehicle allocation index; drafts hold no vehicles."""
+	clear_vehicle_allocations(reservation.name)
+	if reservation.docstatus != 1:
+		return
+
+	bulk_insert_docs("Vehicle Allocation", VEHICLE_ALLOCATION_BULK_FIELDS, [
+		{**allocation, "reservation": reservation.name}
+		for allocation in get_reservation_allocations(reservation)
+	])
+
+
+def clear_vehicle_allocations(reservation_name):
+	frappe.db.delete("Vehicle Allocation", {"reservation": reservation_name})
+
+
+@frappe.whitelist()
+def get_free_vehicles(from_date, to_date):
+	"""Vehicles no submitted reservation uses on any day between the two dates (inclusive)."""
+	busy = frappe.db.sql(f"""
+		SELECT DISTINCT allocation.vehicle
+		FROM `tabVehicle Allocation` allocation
+		{SUBMITTED_RESERVATION_JOIN}
+		WHERE allocation.allocation_date BETWEEN %(from_date)s AND %(to_date)s
+	""", {"from_date": getdate(from_date), "to_date": getdate(to_date)}, pluck=True)
+
+	return frappe.get_all(
+		"Vehicle",
+		filters={"name": ["not in", busy]} if busy else {},
+		pluck="name",
+		order_by="name asc",
+	)
+
+
+@frappe.whitelist()
+def get_fleet_utilisation(from_date, to_date):
+	"""Per-vehicle booked days and utilisation between the two dates (inclusive)."""
+	from_date, to_date = getdate(from_date), getdate(to_date)
+	days = date_diff(to_date, from_date) + 1
+	if days <= 0:
+		frappe.throw("To Date must be on or after From Date.")
+
+	booked = dict(frappe.db.sql(f"""
+		SELECT allocation.vehicle, COUNT(DISTINCT allocation.allocation_date)
+		FROM `tabVehicle Allocation` allocation
+		{SUBMITTED_RESERVATION_JOIN}
+		WHERE allocation.allocation_date BETWEEN %(from_date)s AND %(to_date)s
+		GROUP BY allocation.vehicle
+	""", {"from_date": from_date, "to_date": to_date}))
+
+	return [
+		{
+			"vehicle": vehicle,
+			"booked_days": cint(booked.get(vehicle)),
+			"utilisation": round(cint(booked.get(vehicle)) * 100 / days, 1),
+		}
+		for vehicle in frappe.get_all("Vehicle", pluck="name", order_by="name asc")
+	]
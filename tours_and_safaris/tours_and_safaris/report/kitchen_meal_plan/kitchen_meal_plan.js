@@ -0,0 +1,27 @@
+// Copyright (c) 2025, wanguimbutu and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["Kitchen Meal Plan"] = {
+    filters: [
+        {
+            fieldname: "from_date",
+            label: __("From Date"),
+            fieldtype: "Date",
+            default: frappe.datetime.get_today(),
+            reqd: 1
+        },
+        {
+            fieldname: "to_date",
+            label: __("To Date"),
+            fieldtype: "Date",
+            default: frappe.datetime.add_days(frappe.datetime.get_today(), 6),
+            reqd: 1
+        },
+        {
+            fieldname: "meal",
+            label: __("Meal"),
+            fieldtype: "Link",
+            options: "Meal Type"
+        }
+    ]
+};
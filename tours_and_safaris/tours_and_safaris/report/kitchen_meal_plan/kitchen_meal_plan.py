@@ -0,0 +1,49 @@
+# Copyright (c) 2025, wanguimbutu and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.utils import date_diff, getdate
+
+from tours_and_safaris.tours_and_safaris.doctype.meal_plan.meal_plan import NO_PREFERENCE, get_meal_plan
+
+MAX_REPORT_DAYS = 366
+
+
+def execute(filters=None):
+	"""One row per date and meal with a covers column per dietary preference, read from Meal Plan."""
+	filters = frappe._dict(filters or {})
+	from_date, to_date = getdate(filters.from_date), getdate(filters.to_date)
+	if not 0 <= date_diff(to_date, from_date) < MAX_REPORT_DAYS:
+		frappe.throw(f"To Date must be on or after From Date and within {MAX_REPORT_DAYS} days of it.")
+
+	rows, diets = {}, set()
+	for plan in get_meal_plan(from_date, to_date, filters.meal):
+		diets.add(plan.dietary_preference)
+		row = rows.setdefault((plan.meal_date, plan.meal), {"meal_date": plan.meal_date, "meal": plan.meal, "total": 0})
+		row[get_diet_column(plan.dietary_preference)] = plan.covers
+		row["total"] += plan.covers
+
+	return get_columns(sorted(diets)), list(rows.values())
+
+
+def get_diet_column(diet):
+	return frappe.scrub(diet) if diet != NO_PREFERENCE else "no_preference"
+
+
+def get_columns(diets):
+	columns = [
+		{"fieldname": "meal_date", "label": "Date", "fieldtype": "Date", "width": 110},
+		{"fieldname": "meal", "label": "Meal", "fieldtype": "Data", "width": 130},
+	]
+	columns += [
+		{
+			"fieldname": get_diet_column(diet),
+			"label": diet if diet != NO_PREFERENCE else "No Preference",
+			"fieldtype": "Int",
+			"width": 120,
+		}
+		for diet in diets
+	]
+	columns.append({"fieldname": "total", "label": "Total Covers", "fieldtype": "Int", "width": 120})
+
+	return columns
@@ -0,0 +1,73 @@
+# Copyright (c) 2025, wanguimbutu and contributors
+# For license information, please see license.txt
+
+import time
+
+import frappe
+from frappe.utils import cint, now_datetime
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def bulk_insert_docs(doctype, fields, rows, docstatus=0):
+    """Insert many rows of `doctype` with one multi-row INSERT and return their names.
+
+    Names are generated up front and no document hooks or validations run, so
+    callers are responsible for keeping any derived state (caches, counters)
+    in step.
+    """
+    if not rows:
+        return []
+
+    now, user = now_datetime(), frappe.session.user
+    columns = ["name", "creation", "modified", "owner", "modified_by", "docstatus", *fields]
+    names, values = [], []
+    for row in rows:
+        name = frappe.generate_hash(length=10)
+        names.append(name)
+        values.append((name, now, now, user, user, docstatus, *(row.get(f) for f in fields)))
+
+    frappe.db.bulk_insert(doctype, columns, values)
+
+    return names
+
+
+def get_chunk_size(chunk_size=None):
+    """Chunk size for batch jobs: the argument, else `tours_and_safaris_chunk_size` in site config."""
+    return cint(chunk_size) or cint(frappe.conf.get("tours_and_safaris_chunk_size")) or DEFAULT_CHUNK_SIZE
+
+
+def run_in_chunks(job_name, fetch_chunk, process_chunk, chunk_size=None):
+    """Run `process_chunk(rows)` on `fetch_chunk(limit)` until it returns nothing, committing each chunk.
+
+    `process_chunk` must move the rows out of what `fetch_chunk` selects (e.g. by
+    changing their status), which also makes the job safe to re-run after it
+    is killed part way. Returns a timing summary that is also logged.
+    """
+    chunk_size = get_chunk_size(chunk_size)
+    started = time.perf_counter()
+    rows_done = chunks = 0
+
+    while True:
+        rows = fetch_chunk(chunk_size)
+        if not rows:
+            break
+
+        process_chunk(rows)
+        frappe.db.commit()
+
+        rows_done += len(rows)
+        chunks += 1
+        if len(rows) < chunk_size:
+            break
+
+    summary = {
+        "job": job_name,
+        "rows": rows_done,
+        "chunks": chunks,
+        "chunk_size": chunk_size,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    frappe.logger("tours_and_safaris").info(summary)
+
+    return summary